@@ -1,115 +1,132 @@
-from domain import Domain
-from predicate import Fact, Not, Object
-from action import Action
+import argparse
+import logging
+from dwr import load
 from planner import Planner
-from problem import Problem
-from bfs import BFS
-from variable import Variable
-
-def load():
-    """Makes the domain and the problem and returns both."""
-    # Variables
-    container = Variable('?c', 'container')
-    containter_2 = Variable('?otro', 'container')
-    arm = Variable('?k', 'arm')
-    stack = Variable('?p', 'stack')
-
-    # Predicates
-    predicates = [Fact('holding', [arm, container]),
-                    Fact('free', [arm]),
-                    Fact('on', [container, stack]),
-                    Fact('at_the_top', [container, stack]),
-                    Fact('on_top', [Variable('?k1', 'container'), Variable('?k2', 'container')])]
-
-    # -----[ Pick up Action ]-----
-
-    # Preconditions
-    preconditions_pup = [predicates[1](arm), predicates[2](container, stack),
-                            predicates[3](container, stack), predicates[4](container, containter_2)]
-
-    # Effects
-    effects_pup = [predicates[0](arm, container), predicates[3](containter_2, stack),
-                        Not(predicates[2](container, stack)), Not(predicates[3](container, stack)),
-                        Not(predicates[4](container, containter_2)), Not(predicates[1](arm))]
-
-    action_pup = Action('pick-up', [arm, container, stack], [containter_2],
-                            preconditions_pup, effects_pup)
-
-    # -----[ Put down Action ]-----
-
-    # Preconditions
-    preconditions_pd = [predicates[0](arm, container), predicates[3](containter_2, stack)]
-
-    # Effects
-    effects_pd = [predicates[2](container, stack), predicates[3](container, stack),
-                    predicates[4](container, containter_2), Not(predicates[3](containter_2, stack)),
-                    Not(predicates[0](arm, container)), predicates[1](arm)]
-
-    action_pd = Action('put-down', [arm, container, stack], [containter_2],
-                            preconditions_pd, effects_pd)
-
-    # ------ Defining the domain ------
-
-    domain = Domain('platform-worker-robot',
-                    ['container', 'stack', 'arm'],
-                    predicates,
-                    [action_pup, action_pd])
-
-    # ------ Defining the problem ------
-
-    # Objetos
-    ca = Object('ca', 'container')
-    cb = Object('cb', 'container')
-    cc = Object('cc', 'container')
-    cd = Object('cd', 'container')
-    ce = Object('ce', 'container')
-    cf = Object('cf', 'container')
-    pallet = Object('pallet', 'container')
-    k1 = Object('k1', 'arm')
-    k2 = Object('k2', 'arm')
-    p1 = Object('p1', 'stack')
-    p2 = Object('p2', 'stack')
-    q1 = Object('q1', 'stack')
-    q2 = Object('q2', 'stack')
-
-    objects = [ca, cb, cc, cd, ce, cf, pallet,
-                k1, k2,
-                p1, q1, p2, q2]
-
-    # Predicates
-    initial_state = [predicates[2](ca, p1), predicates[2](cb, p1), predicates[2](cc, p1),
-                        predicates[2](cd, q1), predicates[2](ce, q1), predicates[2](cf, q1),
-                        predicates[4](ca, pallet), predicates[4](cb, ca), predicates[4](cc, cb),
-                        predicates[4](cd, pallet), predicates[4](ce, cd), predicates[4](cf, ce),
-                        predicates[3](cc, p1), predicates[3](cf, q1), predicates[3](pallet, p2), predicates[3](pallet, q2),
-                        predicates[1](k1), predicates[1](k2)]
-
-    goal = [predicates[2](ca, p2), predicates[2](cb, q2), predicates[2](cc, p2),
-                        predicates[2](cd, q2), predicates[2](ce, q2), predicates[2](cf, q2)]
-
-    #goal = [predicates[2](cf, p2), predicates[2](ce, q2)]
-
-    # Definición del problema
-    problem = Problem('dwrpb1', domain, objects, initial_state, goal)
-
-    return domain, problem
+from agenda import GoalAgenda
+from grounding import GroundTask
+from pddl import CACHE_DIR, load_domain, load_problem, load_task
+from plancache import PLAN_CACHE, PlanCache
+from heuristics import HEURISTICS
+from invariants import FiniteDomainEncoding
+from deepening import TABLES
+from search import SEARCHES, make_search
+from stats import SearchStatistics
+from symmetry import Symmetries
+from writer import write_domain, write_problem
 
 def main():
-    domain, problem = load()
-
-    txt = open('./domain.txt', 'w')
-    txt.write(str(domain))
-    txt.close()
-    txt = open('./problem.txt', 'w')
-    txt.write(str(problem))
-    txt.close()
-
-    planner = Planner(domain, problem)
-
-    print('\nSearching the goal using BFS...\n')
-
-    bfs = BFS(planner)
-    p = bfs.busqueda_por_amplitud()
+    parser = argparse.ArgumentParser(description='Generates the PDDL files of the problem and searches a plan.')
+    parser.add_argument('--search', choices=SEARCHES, default='bfs', help='Search engine to use.')
+    parser.add_argument('--heuristic', choices=HEURISTICS, default='hff',
+                        help='Heuristic of the best-first engines (gbfs, astar, wastar).')
+    parser.add_argument('--weight', type=float, default=2, help='Weight of the heuristic in wastar.')
+    parser.add_argument('--workers', type=int, help='Number of processes of the parallel search. By default, the number of cores.')
+    parser.add_argument('--memory-budget', type=float, default=64,
+                        help='Megabytes of successors the external search keeps in memory before writing them to disk.')
+    parser.add_argument('--table-size', type=int, default=100000,
+                        help='Maximum number of states of the transposition table of iddfs and idastar.')
+    parser.add_argument('--table-policy', choices=TABLES, default='lru',
+                        help='Replacement policy of the transposition table: least recently used, or lowest level first.')
+    parser.add_argument('--symmetry', action='store_true',
+                        help='Treat states that only differ by interchangeable objects as the same state (bfs, gbfs, astar, wastar).')
+    parser.add_argument('--por', action='store_true',
+                        help='Apply only the actions of a strong stubborn set in every state (bfs, gbfs, astar, wastar).')
+    parser.add_argument('--sas', action='store_true',
+                        help='Store the visited states as compact finite-domain vectors (bfs, gbfs, astar, wastar, iddfs, idastar).')
+    parser.add_argument('--agenda', action='store_true',
+                        help='Achieve the goals one at a time, searching every stage with --search.')
+    parser.add_argument('--lifted', action='store_true',
+                        help='Match the actions against every state instead of grounding them first.')
+    parser.add_argument('--domain', help='PDDL domain file. By default, the domain of load() is used.')
+    parser.add_argument('--problem', help='PDDL problem file. It must be given with --domain.')
+    parser.add_argument('--no-cache', action='store_true', help='Parse and ground the PDDL files even if they are cached.')
+    parser.add_argument('--plan-cache', nargs='?', const=PLAN_CACHE,
+                        help=f'Look the plan up in a sqlite plan cache before searching, and store it after. '
+                             f'By default, {PLAN_CACHE}.')
+    parser.add_argument('--plan-cache-size', type=int, default=10000, help='Maximum number of plans of the plan cache.')
+    parser.add_argument('--verbose', action='store_true', help='Show the progress of the search.')
+    parser.add_argument('--timing', action='store_true',
+                        help='Measure the time spent in every phase of the search (it slows the search down).')
+    parser.add_argument('--sample-every', type=int, help='Take a sample of the counters every this many expansions.')
+    parser.add_argument('--stats', help='File where the statistics of the search are written as JSON.')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(message)s')
+
+    if args.por and args.lifted:
+        parser.error('--por needs the ground task, so it can\'t be used with --lifted.')
+    if args.sas and args.lifted:
+        parser.error('--sas needs the ground task, so it can\'t be used with --lifted.')
+
+    task = None
+    if args.domain or args.problem:
+        if not (args.domain and args.problem):
+            parser.error('--domain and --problem must be given together.')
+        if args.lifted:
+            domain = load_domain(args.domain)
+            problem = load_problem(args.problem, domain)
+        else:
+            domain, problem, task = load_task(args.domain, args.problem, None if args.no_cache else CACHE_DIR)
+    else:
+        domain, problem = load()
+
+        txt = open('./domain.txt', 'w')
+        write_domain(domain, txt)
+        txt.close()
+        txt = open('./problem.txt', 'w')
+        write_problem(problem, txt)
+        txt.close()
+
+    if not args.lifted:
+        if task is None:
+            task = GroundTask(domain, problem)
+        stats = task.stats()
+        print(f'\nGrounded {stats["operators"]} operators over {stats["facts"]} facts '
+              f'({stats["layers"]} layers) in {stats["grounding_time"]:.3f}s')
+
+    planner = Planner(domain, problem, task=task)
+
+    if args.symmetry:
+        symmetries = Symmetries(problem)
+        print(f'\nInterchangeable objects: {symmetries if symmetries else "none"}')
+
+    if args.sas:
+        print(f'\nFinite-domain encoding: {FiniteDomainEncoding(task, domain, problem.init_atoms)}')
+
+    print(f'\nSearching the goal using {args.search.upper()}...\n')
+
+    stats = SearchStatistics(args.timing, args.sample_every)
+    if args.agenda:
+        engine = GoalAgenda(planner, args.search, args.heuristic, args.weight, stats=stats, workers=args.workers,
+                            memory_budget=args.memory_budget, table_size=args.table_size,
+                            policy=args.table_policy, symmetry=args.symmetry, por=args.por, sas=args.sas)
+    else:
+        engine = make_search(args.search, planner, args.heuristic, args.weight, args.workers, stats,
+                             args.memory_budget, args.table_size, args.table_policy, args.symmetry,
+                             args.por, args.sas)
+    if args.plan_cache:
+        cache = PlanCache(args.plan_cache, args.plan_cache_size)
+        p = cache.search(engine)
+        cache.close()
+        if cache.hits:
+            print(f'Plan of {p.level} actions found in the plan cache in {cache.lookup_time:.3f}s.')
+            p.write_actions('./actions.txt')
+            return
+    else:
+        p = engine.search()
+
+    if args.stats:
+        with open(args.stats, 'w') as f:
+            f.write(stats.to_json())
+
+    if p == -1:
+        if stats.outcome == 'exhausted after pruning':
+            print(f'\nNo plan was found, but {stats.pruned} nodes were pruned: the goal may still be reachable.')
+        else:
+            print('\nThe goal is not reachable.')
+        return
+
+    print(f'Plan of {p.level} actions found in {stats.time:.3f}s ({stats.expanded} nodes expanded).')
 
     p.write_actions('./actions.txt')
 
@@ -29,10 +29,10 @@ class Action:
         else:
             dic['vars'] = ''
 
-        if len(self.preconditions) >= 2:
+        if len(self.preconditions) != 1: # An empty conjunction is written as (and ).
             dic['prec'] = '(and ' + dic['prec'] + ')'
 
-        if len(self.effects) >= 2:
+        if len(self.effects) != 1:
             dic['efec'] = '(and ' + dic['efec'] + ')'
 
         return """(:action {name}
@@ -0,0 +1,168 @@
+import copy
+import logging
+from engine import SearchEngine
+from grounding import GroundTask
+from heuristics import HAdd
+from planner import Planner
+from search import make_search
+from stats import SearchStatistics
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('expanded', 'generated', 'duplicates', 'pruned', 'dead_ends', 'reduced') # Counters added up over the stages.
+
+def _reachable(task, facts, pre_of, deleters, frozen):
+    """Returns the set of the facts reachable from the given ones ignoring the delete effects, without the
+    operators that delete any of the frozen facts.
+    :param task: GroundTask.
+    :param facts: Indices of the facts of the state.
+    :param pre_of: For every fact, the indices of the operators that have it as precondition.
+    :param deleters: For every fact, the indices of the operators that delete it.
+    :param frozen: Indices of the facts that can't be deleted.
+    """
+    banned = {i for f in frozen for i in deleters[f]}
+    missing = [len(op.pre) for op in task.operators]
+    reached = set(facts)
+    pending = list(reached)
+    for i, op in enumerate(task.operators):
+        if not op.pre and i not in banned:
+            pending.extend(f for f in op.add if f not in reached)
+            reached.update(op.add)
+
+    while pending:
+        f = pending.pop()
+        for i in pre_of[f]:
+            missing[i] -= 1
+            if missing[i] == 0 and i not in banned:
+                for g in task.operators[i].add:
+                    if g not in reached:
+                        reached.add(g)
+                        pending.append(g)
+    return reached
+
+class GoalAgenda(SearchEngine):
+    """Solves the goals one at a time instead of all together.
+
+    Every stage adds one goal to the ones already achieved and searches, from the state where the last
+    stage ended, a state with all of them. The next goal is the cheapest one for h_add from the current
+    state, unless it blocks other goals: if, from the final state of its stage, some goal left is not
+    reachable ignoring delete effects and without deleting the goals already achieved, it has to be
+    achieved after that goal (like a container that would be put on top of another one that still has
+    to leave the stack), so the next cheapest goal is tried. When all the goals tried block some other,
+    the one that blocks the fewest is taken, and the later stages will have to undo it and achieve it again. If no
+    goal can be achieved from the current state, the whole problem is searched from the beginning."""
+    def __init__(self, planner, search='bfs', heuristic='hff', weight=2, candidates=3, stats=None, **options):
+        """
+        :param planner: Root planner.
+        :param search: Engine of every stage, one of the keys of search.SEARCHES.
+        :param heuristic: Heuristic of the engine of every stage.
+        :param weight: Weight of the heuristic in wastar.
+        :param candidates: Maximum number of goals tried in every stage, the cheapest ones.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing. The
+            counters of all the stages are added up, and a progress record is taken after every stage.
+        :param options: Other arguments of search.make_search, like workers or table_size.
+        """
+        super().__init__(planner, stats)
+        self.search_name = search
+        self.heuristic = heuristic
+        self.weight = weight
+        self.candidates = candidates
+        self.options = options
+        self.stages = [] # Goal achieved in every stage, in order.
+        self.fallback = False # Whether the whole problem had to be searched at once.
+
+    def _solve(self, problem, task, state, goals, stats):
+        """Searches a state with all the goals from the given state. Returns the planner that reaches
+        it, rooted at a planner of the state, or -1."""
+        stage_problem = copy.copy(problem)
+        stage_problem.init_atoms = state
+        stage_problem.goal_atoms = frozenset(goals)
+        return self._run(Planner(self.planner.domain, stage_problem, state, task.with_goal(goals)), stats)
+
+    def _run(self, root, stats):
+        """Searches from the root with a new engine and adds its counters to the statistics."""
+        stage_stats = SearchStatistics(stats.timing)
+        engine = make_search(self.search_name, root, self.heuristic, self.weight, stats=stage_stats, **self.options)
+        p = engine.search()
+        for counter in COUNTERS:
+            setattr(stats, counter, getattr(stats, counter) + getattr(stage_stats, counter))
+        return p
+
+    def _search(self, stats):
+        root = self.planner
+        if root.is_goal():
+            return root
+
+        problem = root.problem
+        task = root.task if root.task is not None else GroundTask(root.domain, problem)
+        if not task.goal_reachable:
+            return -1
+        pre_of = [[] for _ in task.facts]
+        deleters = [[] for _ in task.facts]
+        for i, op in enumerate(task.operators):
+            for f in op.pre:
+                pre_of[f].append(i)
+            for f in op.delete:
+                deleters[f].append(i)
+        h = HAdd(Planner(root.domain, problem, task=task))
+        index = task.index
+
+        current = root
+        done = set()
+        left = set(problem.goal_atoms)
+        self.stages = []
+        self.fallback = False
+
+        while left:
+            cost = h.costs(current.state, until_goal=False)[0]
+            best = None # (goals blocked, goal, planner) of the best stage.
+            for g in sorted(left, key=lambda g: (cost[index[g]], g.name, g.args))[:self.candidates]:
+                p = self._solve(problem, task, current.state, done | {g}, stats)
+                if p == -1:
+                    continue
+                if not _valid(p):
+                    logger.warning('The plan of the stage of %s is not valid: the goal is left for later.', g)
+                    continue
+                reached = _reachable(task, [index[a] for a in p.state], pre_of, deleters, [index[a] for a in done | {g}])
+                blocked = sum(1 for r in left if r is not g and index[r] not in reached)
+                if best is None or blocked < best[0]:
+                    best = blocked, g, p
+                if blocked == 0:
+                    break
+                logger.info('%s is left for later: it blocks %d goals.', g, blocked)
+
+            if best is None:
+                break # No goal can be achieved from here.
+            blocked, g, p = best
+            for action, predicates in _actions(p):
+                current = current.apply_action(action, predicates)
+            done.add(g)
+            left.discard(g)
+            self.stages.append(g)
+            stats.progress(0, goals_left=len(left), stage=len(self.stages), goal=str(g), blocked=blocked, level=current.level)
+            logger.info('Stage %d: %s achieved (%d actions so far).', len(self.stages), g, current.level)
+
+        if left:
+            logger.info('The goal agenda failed: searching the whole problem.')
+            self.fallback = True
+            return self._run(root, stats)
+
+        return current
+
+def _valid(p):
+    """Checks that every action of the plan that reaches the planner is applicable in the state where it's applied."""
+    while p.father is not None:
+        action, predicates = p.action_taken
+        if not (p.father.state.issuperset(predicates) and p.father.verify_action(action, predicates)):
+            return False
+        p = p.father
+    return True
+
+def _actions(p):
+    """Returns the list of the actions, as (action, predicates), that reach the planner from its root."""
+    actions = []
+    while p.father is not None:
+        actions.append(p.action_taken)
+        p = p.father
+    actions.reverse()
+    return actions
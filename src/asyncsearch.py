@@ -0,0 +1,303 @@
+import asyncio
+import multiprocessing
+import pickle
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import count
+from time import perf_counter, time
+from batch import compile_domain, problem_from_dict, problem_to_dict, status
+from grounding import GroundTask
+from planner import Planner
+from problem import Problem
+from search import make_search
+from stats import SearchStatistics
+
+CHECK_EVERY = 256 # Number of goal tests between two checks of the cancellation and the deadlines.
+
+DOMAINS_KEPT = 8 # Number of unpickled domains that every worker process keeps.
+
+_domains = OrderedDict() # Domains unpickled by this worker process, by their key, the least recently used first.
+
+def _domain(domain):
+    """Returns the domain sent to a worker: the domain itself, in a thread, or a pair (key, pickled domain),
+    in a process, which is unpickled only the first time, so that its actions, and the functions compiled
+    for them, are reused by the next requests."""
+    if not isinstance(domain, tuple):
+        return domain
+    key, data = domain
+    if key not in _domains:
+        _domains[key] = pickle.loads(data)
+        if len(_domains) > DOMAINS_KEPT:
+            _domains.popitem(last=False)
+    _domains.move_to_end(key)
+    return _domains[key]
+
+class SearchCancelled(Exception):
+    """Raised inside the search to stop it: the request was cancelled or it reached a deadline."""
+    def __init__(self, reason):
+        """
+        :param reason: Status of the result: cancelled or timeout.
+        """
+        super().__init__(reason)
+        self.reason = reason
+
+class _Monitor(SearchStatistics):
+    """Statistics of a search run by a PlanningPool. Besides counting, they send the progress of the
+    search to the request, stop the search when the request is cancelled or reaches a deadline, and
+    keep the node with the most goals achieved, which is the partial result if the search is stopped.
+
+    The goal test of the engines, which is taken through timed, is wrapped to see every node; the
+    engines that don't test planners (external, vector, parallel) are only checked on their progress
+    records and samples, and have no partial result."""
+    def __init__(self, cancel, events, deadline, max_expanded, progress_every):
+        """
+        :param cancel: Event set when the request is cancelled.
+        :param events: Queue where the progress events are put.
+        :param deadline: Wall-clock time (as returned by time.time) when the search is stopped, or None.
+        :param max_expanded: Number of expanded nodes at which the search is stopped, or None.
+        :param progress_every: Minimum seconds between two 'sample' events.
+        """
+        super().__init__(sample_every=CHECK_EVERY, callbacks=[self._event])
+        self.cancel = cancel
+        self.events = events
+        self.deadline = deadline
+        self.max_expanded = max_expanded
+        self.progress_every = progress_every
+        self.best = None # Planner with the most goals achieved among the ones tested.
+        self.best_goals = -1
+        self.last_event = 0
+
+    def timed(self, name, function):
+        function = super().timed(name, function)
+        if name != 'is_goal':
+            return function
+
+        tests = 0
+
+        def is_goal(planner):
+            nonlocal tests
+            goals = planner.how_many_goals()
+            if goals > self.best_goals:
+                self.best, self.best_goals = planner, goals
+            tests += 1
+            if tests % CHECK_EVERY == 0:
+                self.check()
+            return function(planner)
+
+        return is_goal
+
+    def check(self):
+        """Raises SearchCancelled if the request was cancelled or it reached a deadline."""
+        if self.cancel.is_set():
+            raise SearchCancelled('cancelled')
+        if self.deadline is not None and time() >= self.deadline:
+            raise SearchCancelled('timeout')
+        if self.max_expanded is not None and self.expanded >= self.max_expanded:
+            raise SearchCancelled('timeout')
+
+    def _event(self, event, stats, record):
+        now = perf_counter()
+        if event == 'finished' or event == 'sample' and now - self.last_event < self.progress_every:
+            return
+        self.last_event = now
+        elapsed = self.time
+        self.events.put(dict(record, event=event, nodes_per_second=self.expanded / elapsed if elapsed else 0))
+        self.check()
+
+def _solve(domain, d, options, cancel, events, deadline, max_expanded, progress_every):
+    """Solves one problem in a worker of the pool and returns its result. The progress is put in events."""
+    result = {'problem': d['name']}
+    start = perf_counter()
+    stats = _Monitor(cancel, events, deadline, max_expanded, progress_every)
+    task = None
+    try:
+        stats.check() # The request may have been cancelled, or timed out, while it was queued.
+        domain = _domain(domain)
+        problem = problem_from_dict(domain, d)
+        task = GroundTask(domain, problem)
+        engine = make_search(options.pop('search'), Planner(domain, problem, task=task), stats=stats, **options)
+        p = engine.search()
+        result['status'] = status(p, stats)
+        result['plan'] = None if p == -1 else p.plan()
+    except SearchCancelled as e:
+        stats.finished(-1)
+        stats.outcome = result['status'] = e.reason
+        if stats.best is not None:
+            result['partial'] = {'plan': stats.best.plan(), 'goals': stats.best_goals,
+                                 'of': len(stats.best.problem.goal_atoms)}
+    except Exception as e:
+        return {'problem': d['name'], 'status': 'error', 'error': repr(e)}
+
+    result['stats'] = dict(task.stats() if task is not None else {}, **stats.to_dict(), time=perf_counter() - start)
+    return result
+
+class PlanningRequest:
+    """A problem submitted to a PlanningPool.
+
+    Awaiting the request returns its result: a dictionary with the name of the problem, its status
+    (solved, unsolvable, exhausted, timeout, cancelled or error, as in batch.status), the plan if it
+    was solved, the statistics of the search and, if it was stopped, the partial result: the actions
+    that reach the node with the most goals achieved, and how many of them it achieves. Iterating over it asynchronously yields its
+    progress events as they come, until the search finishes."""
+    def __init__(self, name, future, cancel, events, poll):
+        """
+        :param name: Name of the problem.
+        :param future: asyncio future of the result.
+        :param cancel: Event that stops the search when it's set.
+        :param events: Queue where the worker puts the progress events.
+        :param poll: Seconds between two reads of the events while there are none.
+        """
+        self.name = name
+        self.future = future
+        self._cancel = cancel
+        self.events = events
+        self.poll = poll
+
+    def cancel(self):
+        """Asks the search to stop. The result is returned with the status cancelled and the partial result."""
+        self._cancel.set()
+
+    def done(self):
+        """Returns whether the search finished."""
+        return self.future.done()
+
+    async def result(self):
+        """Waits for the result and returns it. If the task that waits is cancelled, the search is cancelled too."""
+        try:
+            return await asyncio.shield(self.future)
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+
+    def __await__(self):
+        return self.result().__await__()
+
+    async def __aiter__(self):
+        while True:
+            try:
+                yield self.events.get_nowait()
+                continue
+            except queue.Empty:
+                pass
+            if self.future.done():
+                # The worker puts every event before it returns, so the ones left are already in the queue.
+                while True:
+                    try:
+                        yield self.events.get_nowait()
+                    except queue.Empty:
+                        return
+            await asyncio.sleep(self.poll)
+
+class PlanningPool:
+    """Pool of workers shared by many asynchronous solve requests.
+
+    The searches run in worker processes, or in threads, so the event loop is never blocked. Every
+    search can be cancelled, and stopped at a wall-clock or node-count deadline; the engines are
+    stopped cooperatively, between two expansions, so the partial result can be returned.
+    Use it as an async context manager:
+
+        async with PlanningPool(workers=4) as pool:
+            request = pool.solve(domain, problem, search='gbfs', time_limit=10)
+            async for event in request:
+                print(event['expanded'], event['nodes_per_second'])
+            result = await request
+    """
+    def __init__(self, workers=None, processes=True, poll=0.05):
+        """
+        :param workers: Number of searches run at the same time. By default, the number of cores.
+        :param processes: Whether the searches run in processes. Otherwise they run in threads, which
+            share the GIL with the event loop.
+        :param poll: Seconds between two reads of the events of a request while there are none.
+        """
+        workers = workers or multiprocessing.cpu_count()
+        self.processes = processes
+        self.poll = poll
+        if processes:
+            self.executor = ProcessPoolExecutor(workers)
+            self.manager = multiprocessing.Manager() # Events and queues shared with the workers.
+        else:
+            self.executor = ThreadPoolExecutor(workers)
+            self.manager = None
+        # Dictionary that maps the id of every domain with requests in flight to [domain sent to the workers,
+        # number of requests]. Every domain sent to a process has a new key, so an id reused after the
+        # domain is dropped never finds an old domain in a worker.
+        self.domains = {}
+        self.keys = count()
+        self.requests = set() # Requests in flight.
+
+    def solve(self, domain, problem, search='gbfs', heuristic='hff', weight=2, time_limit=None, max_expanded=None,
+              progress_every=0.5, **options):
+        """Submits the problem and returns its PlanningRequest. It must be called from the event loop.
+        :param domain: Domain of the world.
+        :param problem: Problem to solve, or a dictionary as returned by batch.problem_to_dict.
+        :param search: Search engine, one of the keys of search.SEARCHES.
+        :param heuristic: Heuristic of the best-first engines.
+        :param weight: Weight of the heuristic in weighted A*.
+        :param time_limit: Seconds of wall-clock time, counted from now, after which the search is stopped.
+        :param max_expanded: Number of expanded nodes after which the search is stopped.
+        :param progress_every: Minimum seconds between two periodic progress events. The events of a new
+            level of BFS, or a better heuristic value, are always sent.
+        :param options: Other arguments of search.make_search, like symmetry or por.
+        """
+        entry = self.domains.get(id(domain))
+        if entry is None:
+            compile_domain(domain)
+            sent = (next(self.keys), pickle.dumps(domain)) if self.processes else domain
+            entry = self.domains[id(domain)] = [sent, 0]
+        entry[1] += 1
+        sent = entry[0]
+        d = problem_to_dict(problem) if isinstance(problem, Problem) else problem
+        if self.manager is not None:
+            cancel, events = self.manager.Event(), self.manager.Queue()
+        else:
+            cancel, events = threading.Event(), queue.Queue()
+        deadline = time() + time_limit if time_limit is not None else None
+        options = dict(options, search=search, heuristic=heuristic, weight=weight)
+
+        future = asyncio.wrap_future(self.executor.submit(_solve, sent, d, options, cancel, events, deadline,
+                                                          max_expanded, progress_every))
+        request = PlanningRequest(d['name'], future, cancel, events, self.poll)
+        self.requests.add(request)
+        future.add_done_callback(lambda _: self._finished(request, id(domain)))
+        return request
+
+    def _finished(self, request, domain):
+        """Forgets a request that finished, and its domain if it has no more requests in flight."""
+        self.requests.discard(request)
+        entry = self.domains[domain]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self.domains[domain]
+
+    async def close(self):
+        """Cancels the searches that are running, waits for them to stop and shuts the workers down.
+        The requests that didn't start are cancelled too."""
+        for request in list(self.requests):
+            request.cancel()
+        await asyncio.get_running_loop().run_in_executor(None, lambda: self.executor.shutdown(cancel_futures=True))
+        if self.manager is not None:
+            self.manager.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+async def solve(domain, problem, search='gbfs', heuristic='hff', weight=2, time_limit=None, max_expanded=None,
+                **options):
+    """Solves one problem in a thread and returns its result, as the result of a PlanningRequest.
+    Cancelling the task that awaits it cancels the search.
+    :param domain: Domain of the world.
+    :param problem: Problem to solve.
+    :param search: Search engine, one of the keys of search.SEARCHES.
+    :param heuristic: Heuristic of the best-first engines.
+    :param weight: Weight of the heuristic in weighted A*.
+    :param time_limit: Seconds of wall-clock time after which the search is stopped.
+    :param max_expanded: Number of expanded nodes after which the search is stopped.
+    :param options: Other arguments of search.make_search, like symmetry or por.
+    """
+    async with PlanningPool(1, processes=False) as pool:
+        return await pool.solve(domain, problem, search, heuristic, weight, time_limit, max_expanded, **options)
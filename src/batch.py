@@ -0,0 +1,211 @@
+import argparse
+import json
+import multiprocessing
+import sys
+from multiprocessing.connection import wait
+from time import perf_counter
+from grounding import GroundTask
+from codegen import compile_action
+from dwr import load
+from heuristics import HEURISTICS
+from matcher import join_order
+from pddl import load_domain, load_problem
+from plancache import PLAN_CACHE, PlanCache
+from planner import Planner
+from predicate import Object
+from problem import Problem
+from search import SEARCHES, make_search
+from stats import peak_memory
+
+try:
+    import resource
+except ImportError:
+    resource = None # Only available on Unix, where the memory limit is supported.
+
+def compile_domain(domain):
+    """Compiles, once, the parts of the search that only depend on the domain: the join order of the
+    preconditions, and the functions generated for every action. The worker processes inherit them."""
+    for action in domain.actions:
+        join_order(action)
+        compile_action(action)
+
+def problem_to_dict(problem):
+    """Returns a dictionary with the name, objects, initial state and goal of the problem, without its domain.
+    :param problem: Problem to convert.
+    """
+    return {'name': problem.name,
+            'objects': {tipo: [o.name for o in problem.d_objects[tipo]] for tipo in problem.d_objects},
+            'init': sorted([a.name, *a.args] for a in problem.init_atoms),
+            'goal': sorted([a.name, *a.args] for a in problem.goal_atoms)}
+
+def problem_from_dict(domain, d):
+    """Builds the problem described by the dictionary (as returned by problem_to_dict) in the given domain.
+    :param domain: Domain of the world.
+    :param d: Dictionary with the problem.
+    """
+    objects = {name: Object(name, tipo) for tipo in d['objects'] for name in d['objects'][tipo]}
+    state = [domain.declaración(p[0])(*[objects[a] for a in p[1:]]) for p in d['init']]
+    goal = [domain.declaración(p[0])(*[objects[a] for a in p[1:]]) for p in d['goal']]
+    return Problem(d['name'], domain, list(objects.values()), state, goal)
+
+def status(p, stats):
+    """Returns the status of a search: solved, unsolvable, or exhausted when BFS finished without a plan
+    after pruning nodes with how_many_goals, so the problem may still be solvable.
+    :param p: Planner returned by the search, or -1.
+    :param stats: SearchStatistics of the search.
+    """
+    if p != -1:
+        return 'solved'
+    return 'exhausted' if stats.outcome == 'exhausted after pruning' else 'unsolvable'
+
+def _solve(domain, d, options, memory_limit, conn):
+    """Solves one problem in its own process and sends the result through conn."""
+    baseline = peak_memory() # Memory of the process before solving, mostly the pages shared with the parent.
+    if memory_limit:
+        limit = memory_limit * 2 ** 20
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    name = d if isinstance(d, str) else d['name']
+    result = {'problem': name}
+    start = perf_counter()
+    try:
+        problem = load_problem(d, domain) if isinstance(d, str) else problem_from_dict(domain, d)
+        task = GroundTask(domain, problem)
+        engine = make_search(options['search'], Planner(domain, problem, task=task),
+                             options['heuristic'], options['weight'])
+        if options['plan_cache']:
+            cache = PlanCache(options['plan_cache'])
+            p = cache.search(engine)
+            cache.close()
+            result['cached'] = cache.hits == 1
+        else:
+            p = engine.search()
+        result['status'] = status(p, engine.stats)
+        result['plan'] = None if p == -1 else p.plan()
+        peak = peak_memory()
+        result['stats'] = dict(task.stats(), **engine.stats.to_dict(), time=perf_counter() - start,
+                               peak_memory=peak, search_memory=peak - baseline if peak is not None else None)
+    except MemoryError:
+        result = {'problem': name, 'status': 'memout'}
+    except Exception as e:
+        result = {'problem': name, 'status': 'error', 'error': repr(e)}
+
+    conn.send(result)
+    conn.close()
+
+def solve_batch(domain, problems, search='gbfs', heuristic='hff', weight=2,
+                workers=None, time_limit=None, memory_limit=None, plan_cache=None):
+    """Solves many problems of the same domain, each one in its own process, with at most workers
+    processes at a time, and yields the result of every problem as soon as it finishes. A problem that
+    exceeds its time is killed, so it doesn't stall the rest, and the memory limit and the memory
+    measured are those of the problem alone. The processes are forked, so they inherit the compiled
+    domain; where processes are spawned instead, the domain is pickled for every problem.
+
+    Every result is a dictionary with the name of the problem, its status (solved, unsolvable,
+    exhausted, timeout, memout or error; see status) and, when the search finished, the plan and the
+    statistics of the search. peak_memory is the peak resident memory of the process, which includes
+    the pages it shares with the parent, and search_memory how much it grew while solving the problem.
+    Both are None where the memory can't be measured (without the resource module, which is Unix-only).
+    :param domain: Domain shared by all the problems.
+    :param problems: Iterable of problems, of dictionaries as returned by problem_to_dict, or of paths
+        of PDDL problem files, which are parsed by the worker processes.
+    :param search: Search engine, one of the keys of search.SEARCHES.
+    :param heuristic: Heuristic of the best-first engines.
+    :param weight: Weight of the heuristic in weighted A*.
+    :param workers: Number of problems solved at the same time. By default, the number of cores.
+    :param time_limit: Seconds of wall-clock time for every problem.
+    :param memory_limit: Megabytes of address space for every problem. It's only supported on Unix.
+    :param plan_cache: File of a PlanCache where every plan is looked up before searching it and stored
+        after. By default, no cache is used.
+    """
+    if memory_limit and resource is None:
+        raise Exception('The memory limit needs the resource module, which is only available on Unix.')
+    compile_domain(domain)
+    options = {'search': search, 'heuristic': heuristic, 'weight': weight, 'plan_cache': plan_cache}
+    workers = workers or multiprocessing.cpu_count()
+    pending = iter(problems)
+    running = {} # Dictionary that maps the connection of every running process to (process, name, deadline).
+    exhausted = False
+
+    while running or not exhausted:
+        while not exhausted and len(running) < workers:
+            d = next(pending, None)
+            if d is None:
+                exhausted = True
+                break
+            if isinstance(d, Problem):
+                d = problem_to_dict(d)
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_solve, args=(domain, d, options, memory_limit, sender))
+            process.start()
+            sender.close()
+            deadline = perf_counter() + time_limit if time_limit else None
+            running[receiver] = (process, d if isinstance(d, str) else d['name'], deadline)
+
+        if not running:
+            break
+
+        deadlines = [deadline for _, _, deadline in running.values() if deadline is not None]
+        timeout = max(0, min(deadlines) - perf_counter()) if deadlines else None
+
+        for conn in wait(list(running), timeout):
+            process, name, _ = running.pop(conn)
+            try:
+                result = conn.recv()
+            except EOFError:
+                # The process died without answering, usually because it ran out of memory.
+                result = {'problem': name, 'status': 'memout' if memory_limit else 'error'}
+            conn.close()
+            process.join()
+            yield result
+
+        now = perf_counter()
+        for conn in [c for c in running if running[c][2] is not None and running[c][2] <= now]:
+            process, name, _ = running.pop(conn)
+            process.kill()
+            process.join()
+            conn.close()
+            yield {'problem': name, 'status': 'timeout'}
+
+def _read_problems(paths):
+    """Yields the problems of the given files: every line of a .jsonl file is a problem as returned
+    by problem_to_dict, and any other file is a PDDL problem file."""
+    for path in paths:
+        if path.endswith('.jsonl'):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield path
+
+def main():
+    parser = argparse.ArgumentParser(description='Solves many problems of the same domain. '
+                                                 'Every result is written as a JSON line as soon as it finishes.')
+    parser.add_argument('problems', nargs='+',
+                        help='PDDL problem files, or .jsonl files with one problem per line as a JSON object '
+                             'with name, objects, init and goal.')
+    parser.add_argument('--domain', help='PDDL domain file. By default, the platform-worker-robot domain of load().')
+    parser.add_argument('--output', help='File where the results are written. By default, the standard output.')
+    parser.add_argument('--search', choices=SEARCHES, default='gbfs', help='Search engine to use.')
+    parser.add_argument('--heuristic', choices=HEURISTICS, default='hff', help='Heuristic of the best-first engines.')
+    parser.add_argument('--weight', type=float, default=2, help='Weight of the heuristic in wastar.')
+    parser.add_argument('--workers', type=int, help='Number of problems solved at the same time. By default, the number of cores.')
+    parser.add_argument('--time-limit', type=float, help='Seconds for every problem.')
+    parser.add_argument('--memory-limit', type=int, help='Megabytes of memory for every problem. Only on Unix.')
+    parser.add_argument('--plan-cache', nargs='?', const=PLAN_CACHE,
+                        help=f'Look every plan up in a sqlite plan cache before searching it. By default, {PLAN_CACHE}.')
+    args = parser.parse_args()
+
+    domain = load_domain(args.domain) if args.domain else load()[0]
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    for result in solve_batch(domain, _read_problems(args.problems), args.search, args.heuristic, args.weight,
+                              args.workers, args.time_limit, args.memory_limit, args.plan_cache):
+        out.write(json.dumps(result) + '\n')
+        out.flush()
+    if out is not sys.stdout:
+        out.close()
+
+if __name__ == '__main__':
+    main()
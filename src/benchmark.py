@@ -0,0 +1,402 @@
+import argparse
+import json
+import platform
+import random
+import sys
+from collections import deque
+from datetime import datetime
+from math import inf
+from time import perf_counter
+from batch import solve_batch
+from codegen import compile_action, compile_effects
+from dwr import load, make_domain
+from generator import generate
+from matcher import StateIndex, match
+from grounding import GroundTask
+from parallel import ParallelBFS
+from planner import Planner
+from predicate import Atom
+from replanning import Replanner
+from search import make_search
+
+def sample_states(planner, n):
+    """Returns up to n different planners reachable from the given one, in breadth-first order.
+    :param planner: Root planner.
+    :param n: Number of planners to return.
+    """
+    sample = []
+    queue = deque([planner])
+    visited = {planner.state}
+
+    while queue and len(sample) < n:
+        v = queue.popleft()
+        sample.append(v)
+        actions = v.applicable_actions()
+        for a in actions:
+            for pred in actions[a]:
+                p = v.apply_action(a, pred)
+                if p.state not in visited:
+                    visited.add(p.state)
+                    queue.append(p)
+
+    return sample
+
+def compare_matchers(planners):
+    """Times Planner.applicable_action against Planner.applicable_action_by_combinations
+    on every action of every given planner, checking that both return the same matches.
+    Returns a dictionary with the time of each one, in seconds, by action name.
+    :param planners: List of planners.
+    """
+    times = {}
+
+    for action in planners[0].domain.actions:
+        t_join = t_comb = 0
+
+        for p in planners:
+            start = perf_counter()
+            join = match(action, StateIndex(p.state), p.problem.object_types)
+            t_join += perf_counter() - start
+
+            start = perf_counter()
+            comb = p.applicable_action_by_combinations(action)
+            t_comb += perf_counter() - start
+
+            if {frozenset(m) for m in join} != {frozenset(m) for m in comb}:
+                raise Exception(f'The matches of {action.name} are different in the state {[str(a) for a in p.state]}')
+
+        times[action.name] = {'join': t_join, 'combinations': t_comb}
+
+    return times
+
+def compare_compiled(planners):
+    """Times the functions generated for every action (codegen.CompiledAction) against matcher.match
+    and the effects applied from codegen.compile_effects, on every action of every given planner,
+    checking that both return the same matches, in the same order, and the same states.
+    Returns a dictionary with the time of each one, in seconds, by action name.
+    :param planners: List of planners.
+    """
+    times = {}
+
+    for action in planners[0].domain.actions:
+        compiled = compile_action(action)
+        deletes, adds = compile_effects(action)
+        t_match = t_compiled_match = t_apply = t_compiled_apply = 0
+
+        for p in planners:
+            index = StateIndex(p.state)
+            types = p.problem.object_types
+
+            start = perf_counter()
+            interpreted = match(action, index, types)
+            t_match += perf_counter() - start
+
+            start = perf_counter()
+            generated = compiled.match(index.by_name, index.by_arg, types)
+            t_compiled_match += perf_counter() - start
+
+            if interpreted != generated:
+                raise Exception(f'The matches of {action.name} are different in the state {[str(a) for a in p.state]}')
+
+            start = perf_counter()
+            states = [p.state.difference([Atom(name, tuple(m[i].args[j] for i, j in sources)) for name, sources in deletes])
+                             .union([Atom(name, tuple(m[i].args[j] for i, j in sources)) for name, sources in adds])
+                      for m in interpreted]
+            t_apply += perf_counter() - start
+
+            start = perf_counter()
+            compiled_states = [compiled.apply(p.state, m) for m in generated]
+            t_compiled_apply += perf_counter() - start
+
+            if states != compiled_states:
+                raise Exception(f'The effects of {action.name} are different in the state {[str(a) for a in p.state]}')
+
+        times[action.name] = {'match': t_match, 'compiled_match': t_compiled_match,
+                              'apply': t_apply, 'compiled_apply': t_compiled_apply}
+
+    return times
+
+def parallel_scaling(planner, workers):
+    """Runs the parallel BFS with every given number of workers. Returns a dictionary that maps
+    the number of workers to the time, in seconds, and the length of the plan.
+    :param planner: Root planner.
+    :param workers: List with the numbers of workers.
+    """
+    times = {}
+
+    for n in workers:
+        start = perf_counter()
+        p = ParallelBFS(planner, n).search()
+        times[n] = {'time': perf_counter() - start, 'length': p.level if p != -1 else None}
+
+    return times
+
+def compare_reduction(domain, problems, engines):
+    """Solves every problem with every engine, with and without partial-order reduction, and returns
+    the list of results, with the plan length and the statistics of both runs.
+    :param domain: Domain of the problems.
+    :param problems: List of (family, size, problem).
+    :param engines: List of engines, as search or search:heuristic. They must support partial-order reduction.
+    """
+    results = []
+
+    for _, _, problem in problems:
+        task = GroundTask(domain, problem)
+        for engine in engines:
+            search, _, heuristic = engine.partition(':')
+            result = {'instance': problem.name, 'engine': engine}
+            for por in (False, True):
+                e = make_search(search, Planner(domain, problem, task=task), heuristic or 'hff', por=por)
+                p = e.search()
+                result['por' if por else 'plain'] = dict(e.stats.to_dict(), plan_length=p.level if p != -1 else None)
+            results.append(result)
+
+    return results
+
+def move_container(state, rng):
+    """Returns the atoms to add and to delete to move the container at the top of a random stack onto
+    another random stack, as if someone moved it by hand.
+    :param state: Frozenset of ground atoms of the platform-worker-robot domain.
+    :param rng: Random generator.
+    """
+    tops = {a.args[1]: a.args[0] for a in state if a.name == 'at_the_top'}
+    source = rng.choice(sorted(s for s in tops if tops[s] != 'pallet'))
+    target = rng.choice(sorted(s for s in tops if s != source))
+    c = tops[source]
+    below = next(a.args[1] for a in state if a.name == 'on_top' and a.args[0] == c)
+    delete = [Atom('on', (c, source)), Atom('at_the_top', (c, source)), Atom('on_top', (c, below)),
+              Atom('at_the_top', (tops[target], target))]
+    add = [Atom('on', (c, target)), Atom('at_the_top', (c, target)), Atom('on_top', (c, tops[target])),
+           Atom('at_the_top', (below, source))]
+    return add, delete
+
+def compare_replanning(domain, problem, changes, seed=0):
+    """Solves the problem, moves a container by hand the given number of times and, after every move,
+    replans and solves the new state from scratch. Returns the list of results of every move: how the
+    replanner got its plan, and the time and plan length of both.
+    :param domain: platform-worker-robot domain.
+    :param problem: Problem to solve.
+    :param changes: Number of moves.
+    :param seed: Seed of the moves.
+    """
+    rng = random.Random(seed)
+    replanner = Replanner(domain, problem)
+    replanner.solve()
+    results = []
+
+    for _ in range(changes):
+        add, delete = move_container(replanner.state, rng)
+        p = replanner.replan(add, delete)
+        cold = Replanner(domain, problem)
+        cold.state = replanner.state
+        q = cold.solve()
+        results.append({'method': replanner.method, 'time': replanner.time, 'length': p.level if p != -1 else None,
+                        'cold_time': cold.time, 'cold_length': q.level if q != -1 else None})
+
+    return results
+
+# Families of problems of growing size. Each one maps a size to the arguments of generator.generate:
+# containers, stacks and arms.
+FAMILIES = {'containers': ([3, 4, 5, 6, 7, 8], lambda size: (size, 4, 2)),
+            'stacks':     ([3, 4, 5, 6], lambda size: (6, size, 2)),
+            'arms':       ([1, 2, 3, 4], lambda size: (6, 4, size))}
+
+ENGINES = ['bfs', 'gbfs:hff', 'astar:hmax', 'wastar:hff'] # Engines of the suite, as search or search:heuristic.
+
+MEMORY_ENGINES = ['bfs', 'external', 'iddfs', 'idastar:hmax'] # Engines compared by their peak memory.
+
+# Metrics that are compared against the baseline. Lower is better. search_memory is the growth of the
+# memory of the process that solves the problem, without the pages it shares with the parent.
+METRICS = ['time', 'expanded', 'search_memory']
+
+def family_problems(domain, families):
+    """Yields (family, size, problem) for every size of every given family.
+    :param domain: platform-worker-robot domain.
+    :param families: Names of the families, keys of FAMILIES.
+    """
+    for family in families:
+        sizes, arguments = FAMILIES[family]
+        for size in sizes:
+            yield family, size, generate(domain, *arguments(size), seed=size, name=f'{family}-{size}')
+
+def _megabytes(size):
+    """Returns the size in bytes as megabytes with one decimal, or n/a if it wasn't measured."""
+    return 'n/a' if size is None else f'{size / 2 ** 20:.1f}'
+
+def run_suite(domain, problems, engines, time_limit=None, memory_limit=None):
+    """Solves every problem with every engine, one at a time, and returns the list of results.
+    Every result has the instance, its family and size, the engine, the status and the statistics.
+    :param domain: Domain of the problems.
+    :param problems: List of (family, size, problem).
+    :param engines: List of engines, as search or search:heuristic.
+    :param time_limit: Seconds for every run.
+    :param memory_limit: Megabytes for every run.
+    """
+    meta = {problem.name: (family, size) for family, size, problem in problems}
+    results = []
+
+    for engine in engines:
+        search, _, heuristic = engine.partition(':')
+        runs = solve_batch(domain, [problem for _, _, problem in problems], search, heuristic or 'hff',
+                           workers=1, time_limit=time_limit, memory_limit=memory_limit)
+        for run in runs:
+            family, size = meta[run['problem']]
+            result = {'instance': run['problem'], 'family': family, 'size': size, 'engine': engine,
+                      'status': run['status']}
+            if run['status'] == 'solved':
+                result['plan_length'] = len(run['plan'])
+            result.update(run.get('stats', {}))
+            results.append(result)
+            print(f'{engine:12} {run["problem"]:16} {run["status"]:10} '
+                  + (f'{result["time"]:8.3f}s {result["expanded"]:9} expanded {result["nodes_per_second"]:9.0f} nodes/s '
+                     f'{_megabytes(result["search_memory"]):>7} MB searching' if 'time' in result else ''), file=sys.stderr)
+
+    return results
+
+def compare(results, baseline, tolerance=0.2, min_time=0.05):
+    """Returns the list of regressions of the results against the baseline, as strings.
+    A run regresses when it isn't solved anymore, when its plan gets longer, or when one of the
+    METRICS grows more than the tolerance. Times shorter than min_time are ignored, since they are noise.
+    :param results: List of results of run_suite.
+    :param baseline: List of results of run_suite to compare with.
+    :param tolerance: Allowed relative growth of the metrics.
+    :param min_time: Seconds under which the times are not compared.
+    """
+    old = {(r['instance'], r['engine']): r for r in baseline}
+    regressions = []
+
+    for r in results:
+        b = old.get((r['instance'], r['engine']))
+        if b is None:
+            continue
+        run = f'{r["engine"]} on {r["instance"]}'
+        if b['status'] == 'solved' and r['status'] != 'solved':
+            regressions.append(f'{run}: {r["status"]}, it was solved')
+            continue
+        if r['status'] != 'solved' or b['status'] != 'solved':
+            continue
+        if r['plan_length'] > b['plan_length']:
+            regressions.append(f'{run}: plan length {b["plan_length"]} -> {r["plan_length"]}')
+        for metric in METRICS:
+            if b.get(metric) is None or r.get(metric) is None:
+                continue # The baseline was taken before the metric was recorded, or it can't be measured here.
+            if metric == 'time' and max(r[metric], b[metric]) < min_time:
+                continue
+            if r[metric] > b[metric] * (1 + tolerance):
+                regressions.append(f'{run}: {metric} {b[metric]:.6g} -> {r[metric]:.6g} '
+                                   f'(+{100 * (r[metric] / b[metric] - 1) if b[metric] else inf:.0f}%)')
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the planner.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('matchers', help='Compare the join-based matcher against the combinations of facts.')
+    codegen = commands.add_parser('codegen', help='Compare the functions generated for every action against the interpreted ones.')
+    codegen.add_argument('--states', type=int, default=2000, help='Number of states where the actions are matched.')
+    parallel = commands.add_parser('parallel', help='Measure the scaling of the parallel BFS.')
+    parallel.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                          help='Numbers of workers of the parallel BFS.')
+    suite = commands.add_parser('suite', help='Run the engines on the families of problems of growing size.')
+    suite.add_argument('--families', nargs='+', choices=FAMILIES, default=list(FAMILIES), help='Families of problems.')
+    suite.add_argument('--engines', nargs='+', default=ENGINES, help='Engines, as search or search:heuristic.')
+    suite.add_argument('--time-limit', type=float, default=60, help='Seconds for every run.')
+    suite.add_argument('--memory-limit', type=int, help='Megabytes for every run. Only on Unix.')
+    suite.add_argument('--output', help='JSON file where the results are written.')
+    suite.add_argument('--compare', help='JSON file with the results of a previous run (the baseline).')
+    suite.add_argument('--tolerance', type=float, default=0.2, help='Allowed relative growth of the metrics.')
+    memory = commands.add_parser('memory', help='Compare the peak memory and time of BFS and the memory-bounded engines.')
+    memory.add_argument('--families', nargs='+', choices=FAMILIES, default=['containers'], help='Families of problems.')
+    memory.add_argument('--engines', nargs='+', default=MEMORY_ENGINES, help='Engines, as search or search:heuristic.')
+    memory.add_argument('--time-limit', type=float, default=60, help='Seconds for every run.')
+    reduction = commands.add_parser('reduction', help='Compare the engines with and without partial-order reduction.')
+    reduction.add_argument('--families', nargs='+', choices=FAMILIES, default=['arms'], help='Families of problems.')
+    reduction.add_argument('--engines', nargs='+', default=['bfs', 'gbfs:hff'], help='Engines, as search or search:heuristic.')
+    replanning = commands.add_parser('replanning', help='Compare replanning after small changes against solving from scratch.')
+    replanning.add_argument('--changes', type=int, default=5, help='Number of containers moved by hand, one at a time.')
+    args = parser.parse_args()
+
+    if args.command == 'replanning':
+        domain = make_domain()
+        problem = generate(domain, 8, 4, 2, seed=5)
+        print(f'Replanning on {problem.name}\n')
+        for r in compare_replanning(domain, problem, args.changes):
+            print(f'{r["method"]:12} {r["time"]:8.3f}s  plan length {r["length"]}   '
+                  f'from scratch {r["cold_time"]:8.3f}s  plan length {r["cold_length"]}')
+        return
+
+    if args.command == 'reduction':
+        domain = make_domain()
+        for r in compare_reduction(domain, list(family_problems(domain, args.families)), args.engines):
+            plain, por = r['plain'], r['por']
+            print(f'{r["engine"]:10} {r["instance"]:10} expanded {plain["expanded"]:7} -> {por["expanded"]:7}  '
+                  f'pruned successors {por["reduced"]:7}  time {plain["search_time"]:7.3f}s -> {por["search_time"]:7.3f}s  '
+                  f'plan length {plain["plan_length"]} -> {por["plan_length"]}')
+        return
+
+    if args.command == 'memory':
+        domain = make_domain()
+        problems = list(family_problems(domain, args.families))
+        results = {(r['instance'], r['engine']): r for r in run_suite(domain, problems, args.engines, args.time_limit)}
+
+        print('Memory used while searching (peak resident memory minus the memory at the start of the process) and time.\n')
+        print(f'{"instance":16}' + ''.join(f'{engine:>24}' for engine in args.engines))
+        for _, _, problem in problems:
+            cells = []
+            for engine in args.engines:
+                r = results[(problem.name, engine)]
+                cells.append(f'{_megabytes(r["search_memory"]):>9} MB {r["time"]:9.3f}s' if r['status'] == 'solved'
+                             else r['status'])
+            print(f'{problem.name:16}' + ''.join(f'{c:>24}' for c in cells))
+        return
+
+    if args.command == 'suite':
+        domain = make_domain()
+        problems = list(family_problems(domain, args.families))
+        results = run_suite(domain, problems, args.engines, args.time_limit, args.memory_limit)
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump({'date': datetime.now().isoformat(), 'python': platform.python_version(),
+                           'results': results}, f, indent=1)
+
+        if args.compare:
+            with open(args.compare) as f:
+                regressions = compare(results, json.load(f)['results'], args.tolerance)
+            for r in regressions:
+                print('REGRESSION', r)
+            print(f'{len(regressions)} regressions against {args.compare}')
+            if regressions:
+                sys.exit(1)
+        return
+
+    domain, problem = load()
+
+    if args.command == 'parallel':
+        print(f'Parallel BFS on {problem.name}\n')
+        times = parallel_scaling(Planner(domain, problem), args.workers)
+        for n, t in times.items():
+            print(f'{n:3} workers: {t["time"]:.3f}s  speedup: {times[args.workers[0]]["time"] / t["time"]:.2f}x  '
+                  f'plan length: {t["length"]}')
+        return
+
+    if args.command == 'codegen':
+        for problem in (problem, generate(domain, 30, 6, 3, seed=1)):
+            planners = sample_states(Planner(domain, problem), args.states)
+            print(f'Compiled actions on {len(planners)} states of {problem.name}\n')
+            for name, t in compare_compiled(planners).items():
+                print(f'{name:10} match: {t["match"]:.4f}s -> {t["compiled_match"]:.4f}s '
+                      f'({t["match"] / t["compiled_match"]:.1f}x)  '
+                      f'apply: {t["apply"]:.4f}s -> {t["compiled_apply"]:.4f}s '
+                      f'({t["apply"] / t["compiled_apply"]:.1f}x)')
+            print()
+        return
+
+    planners = sample_states(Planner(domain, problem), 200)
+
+    print(f'Matching on {len(planners)} states of {problem.name}\n')
+    for name, t in compare_matchers(planners).items():
+        print(f'{name:10} join: {t["join"]:.4f}s  combinations: {t["combinations"]:.4f}s  '
+              f'speedup: {t["combinations"] / t["join"]:.1f}x')
+
+if __name__ == '__main__':
+    main()
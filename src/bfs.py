@@ -1,37 +1,102 @@
-class BFS:
+import logging
+from collections import deque
+from functools import partial
+from engine import SearchEngine
+from planner import Planner
+
+logger = logging.getLogger(__name__)
+
+def _state(state):
+    return state
+
+def state_key(symmetries=None, encoding=None):
+    """Returns the function that gives the key of a state in the visited sets of the engines: the state
+    itself, its canonical form if there are symmetries, encoded if there is an encoding.
+    :param symmetries: Symmetries of the task, or None.
+    :param encoding: FiniteDomainEncoding of the task, or None.
+    """
+    key = symmetries.canonical if symmetries else _state
+    if encoding is None:
+        return key
+    encode = encoding.encode
+    return encode if key is _state else lambda state: encode(key(state))
+
+class BFS(SearchEngine):
     """Implementation of BFS for the planner."""
-    def __init__(self, planner):
-        self.planner = planner
+    def __init__(self, planner, stats=None, symmetries=None, reduction=None, encoding=None):
+        """
+        :param planner: Root planner.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        :param symmetries: Symmetries of the problem. If they are given, a state symmetric to one already
+            queued is a duplicate.
+        :param reduction: StubbornSets of the problem. If it's given, only the actions of a stubborn set
+            are applied in every state.
+        :param encoding: FiniteDomainEncoding of the task. If it's given, the visited set stores the encoded states.
+        """
+        super().__init__(planner, stats)
+        self.symmetries = symmetries
+        self.reduction = reduction
+        self.encoding = encoding
 
     def busqueda_por_amplitud(self):
+        """Same as search, with the name that BFS had before the other search engines."""
+        return self.search()
+
+    def search(self):
         """Executes BFS on the planner.
-           It returns the planner with the problem already on the goal. Otherwise it will return -1."""
-        queue = []
+           It returns the planner with the problem already on the goal. Otherwise it will return -1,
+           and self.stats.outcome says why."""
+        result = super().search()
+        if result == -1:
+            logger.info('BFS finished without reaching the goal: %s (%d nodes pruned by how_many_goals).',
+                        self.stats.outcome, self.stats.pruned)
+        return result
+
+    def _search(self, stats):
+        if self.reduction is not None:
+            applicable_actions = stats.timed('applicable_actions', partial(self.reduction.applicable_actions, stats=stats))
+        else:
+            applicable_actions = stats.timed('applicable_actions', Planner.applicable_actions)
+        apply_action = stats.timed('apply_action', Planner.apply_action)
+        is_goal = stats.timed('is_goal', Planner.is_goal)
+
+        key = state_key(self.symmetries, self.encoding)
+        queue = deque()
         queue.append(self.planner)
-        self.planner.explorado = True
+        visited = {key(self.planner.state)} # Keys of the states already queued. A state is never expanded twice.
         previous_level = -1
         goals = 0
 
         while len(queue) != 0:
-            v = queue.pop(0)
+            v = queue.popleft()
 
             if previous_level != v.level:
-                print('Level of exploration:', v.level)
+                stats.progress(len(queue) + 1, level=v.level)
+                logger.info('Level of exploration: %d', v.level)
                 previous_level = v.level
 
-            if v.is_goal():
+            if is_goal(v):
                 return v
 
-            actions = v.applicable_actions()
+            actions = applicable_actions(v)
+            stats.expanded += 1
 
             for a in actions:
                 for pred in actions[a]:
-                    p = v.apply_action(a, pred)
+                    p = apply_action(v, a, pred)
+                    stats.generated += 1
+                    k = key(p.state)
+                    if k in visited:
+                        stats.duplicates += 1
+                        continue
                     x = p.how_many_goals()
                     if goals <= x:
                         goals = x
-                        if not(p.explored):
-                            p.explored = True
-                            queue.append(p)
+                        visited.add(k)
+                        queue.append(p)
+                    else:
+                        stats.pruned += 1
+
+            stats.sample(len(queue))
 
         return -1
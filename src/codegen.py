@@ -0,0 +1,123 @@
+from weakref import WeakKeyDictionary
+from matcher import join_order
+from predicate import Atom, Not
+
+# The caches are weak, so that the compiled code of a domain is freed with its actions.
+_compiled_effects = WeakKeyDictionary() # Cache of the effects of every action, compiled by compile_effects.
+
+def compile_effects(action):
+    """Compiles the effects of an action so that they can be grounded without binding its variables.
+    Returns a pair of tuples (deletes, adds). Every effect is a pair (name, sources), where sources has,
+    for each argument, the position of the precondition and of the argument from where its object is taken.
+    :param action: Action to compile.
+    """
+    compiled = _compiled_effects.get(action)
+    if compiled is None:
+        sources = {}
+        for i, pre in enumerate(action.preconditions):
+            for j, v in enumerate(pre.variables):
+                sources.setdefault(v.name, (i, j))
+
+        deletes = []
+        adds = []
+        for e in action.effects:
+            effect = (e.declaration.name, tuple(sources[v.name] for v in e.variables))
+            if type(e) is Not:
+                deletes.append(effect)
+            else:
+                adds.append(effect)
+
+        compiled = _compiled_effects[action] = (tuple(deletes), tuple(adds))
+    return compiled
+
+_compiled = WeakKeyDictionary() # Cache of the compiled functions of every action.
+
+class CompiledAction:
+    """Functions specialized for one action, generated as Python source when the action is compiled.
+
+    match(by_name, by_arg, types) returns the same list as matcher.match, in the same order: the
+    preconditions are joined with nested loops in the order of matcher.join_order, every loop takes the
+    candidates from the index of the state with the positions bound by the previous loops, and the
+    variables are compared and type checked inline, without a binding dictionary.
+
+    effects(predicates) returns the pair (deletes, adds) of ground atoms of the action applied with the
+    given atoms, and apply(state, predicates) the state after applying it, like Planner.apply_action."""
+    def __init__(self, action):
+        """
+        :param action: Action to compile. It isn't referenced, so that it can be freed while it's cached.
+        """
+        self.source = _source(action)
+        namespace = {'Atom': Atom}
+        exec(compile(self.source, f'<action {action.name}>', 'exec'), namespace)
+        self.match = namespace['match']
+        self.effects = namespace['effects']
+        self.apply = namespace['apply']
+
+def compile_action(action):
+    """Returns the CompiledAction of the action. It's compiled only the first time.
+    :param action: Action to compile.
+    """
+    compiled = _compiled.get(action)
+    if compiled is None:
+        compiled = _compiled[action] = CompiledAction(action)
+    return compiled
+
+def _source(action):
+    """Returns the source of the functions match, effects and apply of the action."""
+    preconditions = action.preconditions
+    lines = ['def match(by_name, by_arg, types):']
+    if any(type(p) is Not for p in preconditions):
+        # Only STRIPS preconditions are supported, as in matcher.match.
+        lines.append('    return []')
+    else:
+        lines.append('    matches = []')
+        bound = {} # Name of the local variable of every variable of the action already bound.
+        indent = '    '
+        done = []
+        for step, i in enumerate(join_order(action)):
+            pre = preconditions[i]
+            name = pre.declaration.name
+            keys = [(j, bound[v.name]) for j, v in enumerate(pre.variables) if v.name in bound]
+            if keys:
+                lines.append(f'{indent}c{step} = by_arg.get(({name!r}, {keys[0][0]}, {keys[0][1]}), ())')
+                for j, local in keys[1:]:
+                    lines.append(f'{indent}t = by_arg.get(({name!r}, {j}, {local}), ())')
+                    lines.append(f'{indent}if len(t) < len(c{step}): c{step} = t')
+            else:
+                lines.append(f'{indent}c{step} = by_name.get({name!r}, ())')
+            lines.append(f'{indent}for a{i} in c{step}:')
+            indent += '    '
+
+            # Atoms with the same name are the same atom if they are chosen twice.
+            same = [f'a{k} is a{i}' for k in done if preconditions[k].declaration.name == name]
+            checks = [f'len(args) != {len(pre.variables)}'] + same
+            lines.append(f'{indent}args = a{i}.args')
+            lines.append(f'{indent}if {" or ".join(checks)}: continue')
+            for j, v in enumerate(pre.variables):
+                if v.name in bound:
+                    lines.append(f'{indent}if args[{j}] != {bound[v.name]}: continue')
+                else:
+                    local = bound[v.name] = f'v{len(bound)}'
+                    lines.append(f'{indent}{local} = args[{j}]')
+                    lines.append(f'{indent}if types.get({local}) != {v.type!r}: continue')
+            done.append(i)
+        lines.append(f'{indent}matches.append(({"".join(f"a{i}, " for i in range(len(preconditions)))}))')
+        lines.append('    return matches')
+
+    deletes, adds = compile_effects(action)
+    predicates = ''.join(f'a{i}, ' for i in range(len(preconditions)))
+    used = sorted({source for _, sources in deletes + adds for source in sources})
+    objects = [f'    o{i}_{j} = a{i}.args[{j}]' for i, j in used]
+
+    def atoms(effects):
+        return ''.join('Atom({0!r}, ({1})), '.format(name, ''.join(f'o{i}_{j}, ' for i, j in sources))
+                       for name, sources in effects)
+
+    for header, body in (('effects(predicates)', f'({atoms(deletes)}), ({atoms(adds)})'),
+                         ('apply(state, predicates)', f'state.difference(({atoms(deletes)})).union(({atoms(adds)}))')):
+        lines.append('')
+        lines.append(f'def {header}:')
+        lines.append(f'    ({predicates}) = predicates')
+        lines.extend(objects)
+        lines.append(f'    return {body}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,183 @@
+import logging
+from collections import OrderedDict
+from math import inf
+from bfs import state_key
+from engine import SearchEngine
+from planner import Planner
+
+logger = logging.getLogger(__name__)
+
+class LRUTable:
+    """Transposition table with at most capacity states. When it's full, the least recently used state is evicted."""
+    def __init__(self, capacity):
+        """
+        :param capacity: Maximum number of states.
+        """
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.evictions = 0
+
+    def clear(self):
+        self.entries.clear()
+
+    def get(self, state):
+        """Returns the lowest level with which the state has been reached, or None if it's not in the table."""
+        level = self.entries.get(state)
+        if level is not None:
+            self.entries.move_to_end(state)
+        return level
+
+    def put(self, state, level):
+        """Stores the level with which the state has been reached."""
+        entries = self.entries
+        entries[state] = level
+        entries.move_to_end(state)
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+            self.evictions += 1
+
+class DepthPreferredTable:
+    """Transposition table with capacity slots. Every state has one slot, chosen by its hash, and when two
+    states share it the one reached with the lowest level is kept, since more search hangs from it."""
+    def __init__(self, capacity):
+        """
+        :param capacity: Number of slots.
+        """
+        self.capacity = capacity
+        self.slots = [None] * capacity # Every slot is None or a pair (state, level).
+        self.evictions = 0
+
+    def clear(self):
+        self.slots = [None] * self.capacity
+
+    def get(self, state):
+        """Returns the lowest level with which the state has been reached, or None if it's not in the table."""
+        slot = self.slots[hash(state) % self.capacity]
+        if slot is not None and slot[0] == state:
+            return slot[1]
+        return None
+
+    def put(self, state, level):
+        """Stores the level with which the state has been reached, unless its slot holds another state
+        reached with a lower level."""
+        i = hash(state) % self.capacity
+        slot = self.slots[i]
+        if slot is None or slot[0] == state:
+            self.slots[i] = (state, level)
+        elif level <= slot[1]:
+            self.slots[i] = (state, level)
+            self.evictions += 1
+
+TABLES = {'lru': LRUTable, 'depth': DepthPreferredTable}
+
+def _children(v, applicable_actions, apply_action):
+    """Yields the successors of the planner, one at a time."""
+    actions = applicable_actions(v)
+    for a in actions:
+        for pred in actions[a]:
+            yield apply_action(v, a, pred)
+
+class IDAStar(SearchEngine):
+    """IDA*: depth-first searches bounded by f = g + h, with a growing bound. Its memory is the path
+    being explored plus a transposition table with a fixed number of states, so it stays flat however
+    deep the search goes. With an admissible heuristic, like h_max, the plan is optimal.
+
+    The transposition table stores the lowest level with which every state has been reached in the
+    current iteration, so a state reached again with the same or a higher level isn't explored twice."""
+    def __init__(self, planner, heuristic, table_size=100000, policy='lru', stats=None, encoding=None):
+        """
+        :param planner: Root planner.
+        :param heuristic: Function that receives a state and returns its heuristic value, inf for dead ends.
+        :param table_size: Maximum number of states of the transposition table.
+        :param policy: Replacement policy of the transposition table, one of the keys of TABLES.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        :param encoding: FiniteDomainEncoding of the task. If it's given, the table stores the encoded states.
+        """
+        if policy not in TABLES:
+            raise Exception(f'Unknown replacement policy {policy}. The policies are {", ".join(TABLES)}.')
+        super().__init__(planner, stats)
+        self.heuristic = heuristic
+        self.table = TABLES[policy](table_size)
+        self.encoding = encoding
+
+    def _search(self, stats):
+        heuristic = stats.timed('heuristic', self.heuristic)
+        h = heuristic(self.planner.state)
+        if h == inf:
+            stats.dead_ends += 1
+            return -1
+
+        bound = h
+        while True:
+            logger.info('Bound: %s', bound)
+            stats.progress(0, bound=bound, evictions=self.table.evictions)
+            result, bound = self._bounded(stats, heuristic, bound)
+            if result is not None:
+                return result
+            if bound == inf:
+                return -1 # No node was cut by the bound: the whole space was explored.
+
+    def _bounded(self, stats, heuristic, bound):
+        """Explores, depth first and without recursion, the nodes with f not greater than the bound.
+        Returns the goal planner, or None, and the lowest f of the nodes cut by the bound."""
+        applicable_actions = stats.timed('applicable_actions', Planner.applicable_actions)
+        apply_action = stats.timed('apply_action', Planner.apply_action)
+        is_goal = stats.timed('is_goal', Planner.is_goal)
+
+        root = self.planner
+        if is_goal(root):
+            return root, bound
+
+        key = state_key(encoding=self.encoding)
+        table = self.table
+        table.clear()
+        table.put(key(root.state), 0)
+        next_bound = inf
+        stack = [_children(root, applicable_actions, apply_action)]
+        stats.expanded += 1
+
+        while stack:
+            p = next(stack[-1], None)
+            if p is None:
+                stack.pop()
+                continue
+
+            stats.generated += 1
+            k = key(p.state)
+            level = table.get(k)
+            if level is not None and level <= p.level:
+                stats.duplicates += 1
+                continue
+            h = heuristic(p.state)
+            if h == inf:
+                stats.dead_ends += 1
+                continue
+            f = p.level + h
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+
+            table.put(k, p.level)
+            if is_goal(p):
+                return p, bound
+            stack.append(_children(p, applicable_actions, apply_action))
+            stats.expanded += 1
+            stats.sample(len(stack))
+
+        return None, next_bound
+
+def _blind(state):
+    return 0
+
+class IDDFS(IDAStar):
+    """Iterative deepening DFS: depth-first searches with a maximum depth that grows by one.
+    The plan is as short as possible."""
+    def __init__(self, planner, table_size=100000, policy='lru', stats=None, encoding=None):
+        """
+        :param planner: Root planner.
+        :param table_size: Maximum number of states of the transposition table.
+        :param policy: Replacement policy of the transposition table, one of the keys of TABLES.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        :param encoding: FiniteDomainEncoding of the task. If it's given, the table stores the encoded states.
+        """
+        super().__init__(planner, _blind, table_size, policy, stats, encoding)
@@ -1,3 +1,6 @@
+from io import StringIO
+from writer import write_domain
+
 def _lista_a_dict(l):
     """ Pone a todos los elementos de la lista en un diccionario cuya
     llave es el nombre del objeto.
@@ -24,22 +27,9 @@ class Domain:
         self._predicados = _lista_a_dict(predicates)
 
     def __str__(self):
-        dic = {'name':          self.name,
-               'types':         "\n        ".join(self.types),
-               'predicates':    "\n        ".join(str(p) for p in self.predicates),
-               'actions':       "\n    ".join(str(a) for a in self.actions)
-               }
-        return """(define (domain {name})
-    (:requirements :strips :typing)
-    (:types
-        {types}
-    )
-    (:predicates
-        {predicates})
-    )
-    {actions}
-)
-""".format(**dic)
+        f = StringIO()
+        write_domain(self, f)
+        return f.getvalue()
 
     def declaración(self, nombre):
         """ 
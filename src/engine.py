@@ -0,0 +1,28 @@
+from stats import SearchStatistics
+
+class SearchEngine:
+    """Base of the search engines. It keeps the root planner and the statistics of the search, and
+    records the start and the end of every search around _search, which every engine implements."""
+    def __init__(self, planner, stats=None):
+        """
+        :param planner: Root planner.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        """
+        self.planner = planner
+        self.stats = stats if stats is not None else SearchStatistics()
+
+    def search(self):
+        """Executes the search on the planner.
+           It returns the planner with the problem already on the goal. Otherwise it will return -1,
+           and self.stats.outcome says why."""
+        stats = self.stats
+        stats.started()
+        result = self._search(stats)
+        stats.finished(result)
+        return result
+
+    def _search(self, stats):
+        """Searches the goal from the root planner and returns the planner that reaches it, or -1.
+        :param stats: Statistics of the search, already started.
+        """
+        raise NotImplementedError
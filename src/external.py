@@ -0,0 +1,192 @@
+import heapq
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from engine import SearchEngine
+from grounding import GroundTask
+
+logger = logging.getLogger(__name__)
+
+ROOT = 0xFFFFFFFF # Operator of the record of the initial state, which has no parent.
+_OP = struct.Struct('>I')
+
+def _bits(mask):
+    """Yields the indices of the bits set in the mask."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+def _records(path, size):
+    """Yields the records of the given size, in bytes, of the file, reading it through a memory map."""
+    length = os.path.getsize(path)
+    if length == 0:
+        return # Empty files can't be mapped.
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        for i in range(0, length, size):
+            yield m[i:i + size]
+
+class ExternalBFS(SearchEngine):
+    """BFS that keeps its layers on disk instead of in memory.
+
+    Every state is packed as a bit vector with one bit per fact of the ground task, and every layer
+    is a file of fixed-width records (state, operator that generated it), sorted by state. The
+    successors of a layer are gathered in memory until they reach the memory budget, and then they
+    are sorted and written as a run. When the layer is finished, the runs are merged and the states
+    already in the layer or in any previous layer are removed while merging (delayed duplicate
+    detection). The plan is rebuilt from the files, looking in every layer for a state that reaches
+    the next one with its operator.
+
+    Unlike BFS, it doesn't prune nodes with how_many_goals, so it's complete."""
+    def __init__(self, planner, memory_budget=64, directory=None, stats=None):
+        """
+        :param planner: Root planner.
+        :param memory_budget: Megabytes of successors kept in memory before they are written to disk.
+        :param directory: Directory where the layers are written, in a temporary directory that is removed
+            at the end. By default, the temporary directory of the system (see tempfile.gettempdir).
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        """
+        super().__init__(planner, stats)
+        self.memory_budget = memory_budget
+        self.directory = directory
+
+    def _search(self, stats):
+        with tempfile.TemporaryDirectory(prefix='external-bfs-', dir=self.directory) as directory:
+            return self._search_in(stats, directory)
+
+    def _search_in(self, stats, directory):
+        root = self.planner
+        if root.is_goal():
+            return root
+
+        task = root.task if root.task is not None else GroundTask(root.domain, root.problem)
+        if not task.goal_reachable:
+            return -1
+
+        self.task = task
+        self.width = width = (len(task.facts) + 7) // 8 # Bytes of a packed state.
+        self.size = size = width + _OP.size # Bytes of a record.
+        self.ops = ops = {op: (i, ~sum(1 << f for f in op.delete), sum(1 << f for f in op.add))
+                          for i, op in enumerate(task.operators)}
+        goal = sum(1 << f for f in task.goal)
+        facts = task.facts
+        applicable = stats.timed('applicable_actions', task.applicable)
+        # Every record in the buffer costs its bytes object and its slot in the list.
+        capacity = max(1, self.memory_budget * 2 ** 20 // (sys.getsizeof(bytes(size)) + 8))
+
+        state = sum(1 << task.index[a] for a in root.state)
+        layers = [os.path.join(directory, 'layer-0.bin')]
+        with open(layers[0], 'wb') as f:
+            f.write(state.to_bytes(width, 'big') + _OP.pack(ROOT))
+        disk = size
+        level = 0
+        count = 1
+
+        while count:
+            level += 1
+            logger.info('Level of exploration: %d', level)
+            runs = []
+            buffer = []
+            remaining = count
+            generated = 0
+
+            for record in _records(layers[-1], size):
+                state = int.from_bytes(record[:width], 'big')
+                for op in applicable(frozenset(facts[i] for i in _bits(state))):
+                    i, keep, add = ops[op]
+                    generated += 1
+                    buffer.append(((state & keep) | add).to_bytes(width, 'big') + _OP.pack(i))
+                    if len(buffer) >= capacity:
+                        runs.append(self._write_run(buffer, directory, level, len(runs)))
+                        buffer = []
+                stats.expanded += 1
+                remaining -= 1
+                stats.sample(remaining)
+            if buffer:
+                runs.append(self._write_run(buffer, directory, level, len(runs)))
+
+            layers.append(os.path.join(directory, f'layer-{level}.bin'))
+            count, found = self._merge(runs, layers[:-1], layers[-1], goal)
+            for run in runs:
+                os.remove(run)
+            stats.generated += generated
+            stats.duplicates += generated - count
+            disk += count * size
+            stats.progress(count, level=level, disk=disk)
+
+            if found is not None:
+                return self._plan(found, layers)
+
+        return -1
+
+    def _write_run(self, buffer, directory, level, number):
+        """Sorts the successors of the buffer and writes them, without repeated states, as a run.
+        Returns the path of the run."""
+        path = os.path.join(directory, f'run-{level}-{number}.bin')
+        width = self.width
+        buffer.sort()
+        last = None
+        with open(path, 'wb') as f:
+            for record in buffer:
+                state = record[:width]
+                if state != last:
+                    f.write(record)
+                    last = state
+        return path
+
+    def _merge(self, runs, previous, path, goal):
+        """Merges the runs into the layer file, removing the states repeated in the runs or already
+        present in the previous layers. Returns the number of states written and a record of the layer
+        that reaches the goal, or None."""
+        width, size = self.width, self.size
+        old = heapq.merge(*[(r[:width] for r in _records(p, size)) for p in previous])
+        seen = next(old, None)
+        count = 0
+        found = None
+        last = None
+
+        with open(path, 'wb') as f:
+            for record in heapq.merge(*[_records(r, size) for r in runs]):
+                state = record[:width]
+                if state == last:
+                    continue
+                last = state
+                while seen is not None and seen < state:
+                    seen = next(old, None)
+                if seen == state:
+                    continue
+                f.write(record)
+                count += 1
+                if found is None and int.from_bytes(state, 'big') & goal == goal:
+                    found = record
+
+        return count, found
+
+    def _plan(self, record, layers):
+        """Rebuilds the plan that reaches the state of the record, in the last layer, and returns
+        the last planner of the plan."""
+        width = self.width
+        operators = self.task.operators
+        masks = [(sum(1 << f for f in op.pre), keep, add) for op, (_, keep, add) in self.ops.items()]
+        steps = []
+
+        for path in reversed(layers[:-1]):
+            target = int.from_bytes(record[:width], 'big')
+            op = _OP.unpack(record[width:])[0]
+            steps.append(operators[op])
+            pre, keep, add = masks[op]
+            for candidate in _records(path, self.size):
+                state = int.from_bytes(candidate[:width], 'big')
+                if state & pre == pre and (state & keep) | add == target:
+                    record = candidate
+                    break
+            else:
+                raise Exception(f'The parent of a state of {path} is not in the previous layer.')
+
+        p = self.planner
+        for op in reversed(steps):
+            p = p.apply_action(op.action, op.predicates)
+        return p
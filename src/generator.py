@@ -0,0 +1,101 @@
+import argparse
+import os
+import random
+from dwr import make_domain
+from predicate import Object
+from problem import Problem
+from writer import write_domain, write_problem
+
+def _layout(domain, stacks, pallet, containers_by_stack):
+    """Returns the predicates that describe the stacks. containers_by_stack has, for every stack,
+    the list of its containers from the bottom to the top."""
+    on = domain.declaración('on')
+    at_the_top = domain.declaración('at_the_top')
+    on_top = domain.declaración('on_top')
+    state = []
+
+    for stack, containers in zip(stacks, containers_by_stack):
+        below = pallet
+        for c in containers:
+            state.append(on(c, stack))
+            state.append(on_top(c, below))
+            below = c
+        state.append(at_the_top(below, stack))
+
+    return state
+
+def generate(domain, containers, stacks, arms, seed=None, worst_case=False, name=None):
+    """Returns a problem of the platform-worker-robot domain with the given number of containers,
+    stacks and arms. The goal says on which stack every container must be.
+
+    In a random problem, every container starts and ends on a random stack, in random order.
+    In the worst case, all the containers start on the first stack and must end on the last one.
+    :param domain: platform-worker-robot domain.
+    :param containers: Number of containers.
+    :param stacks: Number of stacks. There must be at least 2.
+    :param arms: Number of arms.
+    :param seed: Seed of the random configurations.
+    :param worst_case: Whether to make the worst-case problem instead of a random one.
+    :param name: Name of the problem. By default, it's made from the sizes and the seed.
+    """
+    if stacks < 2:
+        raise Exception('There must be at least 2 stacks.')
+
+    rng = random.Random(seed)
+    pallet = Object('pallet', 'container')
+    cs = [Object(f'c{i}', 'container') for i in range(1, containers + 1)]
+    ss = [Object(f's{i}', 'stack') for i in range(1, stacks + 1)]
+    ks = [Object(f'k{i}', 'arm') for i in range(1, arms + 1)]
+
+    if worst_case:
+        initial = [cs] + [[] for _ in ss[1:]]
+        final = [(c, ss[-1]) for c in cs]
+    else:
+        initial = [[] for _ in ss]
+        order = cs[:]
+        rng.shuffle(order)
+        for c in order:
+            initial[rng.randrange(stacks)].append(c)
+        final = [(c, rng.choice(ss)) for c in cs]
+
+    free = domain.declaración('free')
+    on = domain.declaración('on')
+    state = _layout(domain, ss, pallet, initial) + [free(k) for k in ks]
+    goal = [on(c, s) for c, s in final]
+
+    if name is None:
+        kind = 'worst' if worst_case else f'seed{seed}'
+        name = f'containers-n{containers}-m{stacks}-k{arms}-{kind}'
+
+    return Problem(name, domain, cs + [pallet] + ks + ss, state, goal)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates problems of the platform-worker-robot domain.')
+    parser.add_argument('--containers', type=int, default=6, help='Number of containers.')
+    parser.add_argument('--stacks', type=int, default=4, help='Number of stacks.')
+    parser.add_argument('--arms', type=int, default=2, help='Number of arms.')
+    parser.add_argument('--count', type=int, default=1, help='Number of problems.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the first problem. The next ones use the next seeds.')
+    parser.add_argument('--worst-case', action='store_true',
+                        help='Generate the problem where all the containers start on the first stack and must end on the last one.')
+    parser.add_argument('--output-dir', default='instances', help='Directory where the files are written.')
+    args = parser.parse_args()
+
+    if args.worst_case and args.count != 1:
+        parser.error('There is only one worst-case problem for every size.')
+
+    domain = make_domain()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    with open(os.path.join(args.output_dir, 'domain.pddl'), 'w') as f:
+        write_domain(domain, f)
+
+    for i in range(args.count):
+        problem = generate(domain, args.containers, args.stacks, args.arms, args.seed + i, args.worst_case)
+        with open(os.path.join(args.output_dir, problem.name + '.pddl'), 'w') as f:
+            write_problem(problem, f)
+
+    print(f'{args.count} problems written in {args.output_dir}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,224 @@
+from array import array
+from collections import deque
+from time import perf_counter
+from codegen import compile_action
+from matcher import StateIndex
+
+class Operator:
+    """Ground action. The preconditions and effects are given both as atoms and as indices of facts of the task."""
+    __slots__ = ('action', 'predicates', 'pre', 'add', 'delete', 'add_atoms', 'delete_atoms')
+
+    def __init__(self, action, predicates, add_atoms, delete_atoms, index):
+        """
+        :param action: Action grounded by this operator.
+        :param predicates: Tuple with the atoms of the preconditions, in the order of the action's preconditions.
+        :param add_atoms: Tuple with the atoms added by the operator.
+        :param delete_atoms: Tuple with the atoms deleted by the operator.
+        :param index: Dictionary that maps every fact of the task to its index.
+        """
+        self.action = action
+        self.predicates = predicates
+        self.add_atoms = add_atoms
+        self.delete_atoms = delete_atoms
+        self.pre = tuple(sorted({index[a] for a in predicates}))
+        self.add = tuple(sorted({index[a] for a in add_atoms}))
+        self.delete = tuple(sorted({index[a] for a in delete_atoms if a in index}))
+
+    def __str__(self):
+        return f'{self.action.name}: {[str(p) for p in self.predicates]}'
+
+class SuccessorGenerator:
+    """Decision tree over the facts of the task that returns the operators applicable in a state.
+    Every node has the operators whose preconditions are exactly the facts tested on the way to it,
+    and one edge for every fact that the next precondition of the other operators can be: only the
+    edges whose fact is true in the state are followed.
+
+    The tree is built as in Fast Downward: the operators are sorted once by their preconditions, so
+    the operators below every node are a contiguous range of the sorted list, and the tree is built
+    in a time linear in the size of the preconditions. It's stored in flat arrays, indexed by node
+    and by edge, so it can be pickled with the task."""
+    def __init__(self, operators, facts):
+        """
+        :param operators: List of operators.
+        :param facts: List of the facts of the task, indexed as in the operators.
+        """
+        self.operators = sorted(operators, key=lambda op: op.pre)
+        self.first = array('i') # Position of the first operator of every node in the sorted operators.
+        self.last = array('i') # Position after the last operator of every node.
+        self.edges = array('i', [0]) # Edges of every node: from edges[node] to edges[node + 1].
+        self.atoms = [] # Fact tested by every edge.
+        self.children = array('i') # Node where every edge leads.
+
+        # The nodes are numbered in the order they are built, so the edges of every node are contiguous.
+        pending = deque([(0, len(self.operators), 0)]) # Range of sorted operators and depth of every node.
+        nodes = 1
+        while pending:
+            lo, hi, depth = pending.popleft()
+            i = lo
+            while i < hi and len(self.operators[i].pre) == depth:
+                i += 1
+            self.first.append(lo)
+            self.last.append(i)
+            while i < hi:
+                fact = self.operators[i].pre[depth]
+                j = i + 1
+                while j < hi and self.operators[j].pre[depth] == fact:
+                    j += 1
+                self.atoms.append(facts[fact])
+                self.children.append(nodes)
+                pending.append((i, j, depth + 1))
+                nodes += 1
+                i = j
+            self.edges.append(len(self.atoms))
+
+    def applicable(self, state):
+        """Returns the list of operators applicable in the state.
+        :param state: Frozenset of ground atoms.
+        """
+        operators, first, last, edges, atoms, children = \
+            self.operators, self.first, self.last, self.edges, self.atoms, self.children
+        result = []
+        stack = [0]
+
+        while stack:
+            node = stack.pop()
+            result.extend(operators[first[node]:last[node]])
+            for e in range(edges[node], edges[node + 1]):
+                if atoms[e] in state:
+                    stack.append(children[e])
+
+        return result
+
+class GroundTask:
+    """Task with the actions of the domain grounded over the objects of the problem."""
+    def __init__(self, domain, problem):
+        """Grounds the actions that are reachable from the initial state of the problem in the
+        relaxed planning graph (ignoring delete effects), layer by layer.
+        :param domain: Domain of the world.
+        :param problem: Problem to solve.
+        """
+        start = perf_counter()
+        # The initial atoms are sorted so that every process that grounds the same problem
+        # obtains the same indices for the facts and the operators.
+        reached = dict.fromkeys(sorted(problem.init_atoms, key=lambda a: (a.name, a.args)))
+        seen = set()
+        grounded = [] # List of (action, predicates, adds, deletes).
+        self.layers = 0
+
+        # The first layer is always expanded, even if the initial state is empty: the actions
+        # without preconditions are applicable anyway.
+        while True:
+            self.layers += 1
+            index = StateIndex(reached)
+            layer = []
+            for action in domain.actions:
+                compiled = compile_action(action)
+                for m in compiled.match(index.by_name, index.by_arg, problem.object_types):
+                    if (action, m) in seen:
+                        continue
+                    seen.add((action, m))
+                    delete, add = compiled.effects(m)
+                    grounded.append((action, m, add, delete))
+                    for atom in add:
+                        if atom not in reached:
+                            reached[atom] = None
+                            layer.append(atom)
+            if not layer:
+                break
+
+        self.facts = list(reached)
+        self.index = {atom: i for i, atom in enumerate(self.facts)}
+        self.operators = [Operator(action, m, add, delete, self.index) for action, m, add, delete in grounded]
+        self.operators_by_match = {(op.action, op.predicates): op for op in self.operators}
+        self.goal = tuple(sorted(self.index[g] for g in problem.goal_atoms if g in self.index))
+        self.goal_reachable = len(self.goal) == len(problem.goal_atoms)
+        self.successor_generator = SuccessorGenerator(self.operators, self.facts)
+        self.grounding_time = perf_counter() - start
+
+    def __getstate__(self):
+        # The dictionaries are rebuilt when unpickling, in a time linear in the operators, instead
+        # of storing their keys again. The successor generator is pickled with the task.
+        state = dict(self.__dict__)
+        del state['operators_by_match'], state['index']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.index = {atom: i for i, atom in enumerate(self.facts)}
+        self.operators_by_match = {(op.action, op.predicates): op for op in self.operators}
+
+    def applicable(self, state):
+        """Returns the list of operators applicable in the state.
+        :param state: Frozenset of ground atoms.
+        """
+        return self.successor_generator.applicable(state)
+
+    def _copy(self):
+        """Returns a shallow copy of the task. Unlike copy.copy, it doesn't go through __setstate__,
+        which would build the dictionaries again."""
+        task = object.__new__(GroundTask)
+        task.__dict__.update(self.__dict__)
+        return task
+
+    def without(self, objects):
+        """Returns a copy of the task without the operators that use any of the given objects, for
+        example an arm that is offline. The facts and their indices are the same.
+        :param objects: Set of names of objects.
+        """
+        task = self._copy()
+        task.operators = [op for op in self.operators
+                          if all(x not in objects for atom in op.predicates for x in atom.args)]
+        task.operators_by_match = {(op.action, op.predicates): op for op in task.operators}
+        task.successor_generator = SuccessorGenerator(task.operators, task.facts)
+        return task
+
+    def with_goal(self, goals):
+        """Returns a copy of the task whose goal are the given atoms. Everything else is shared.
+        :param goals: Atoms of the new goal.
+        """
+        task = self._copy()
+        task.goal = tuple(sorted(self.index[g] for g in goals if g in self.index))
+        task.goal_reachable = len(task.goal) == len(goals)
+        return task
+
+    def stats(self):
+        """Returns a dictionary with the size of the task and the time spent grounding it."""
+        return {'facts': len(self.facts),
+                'operators': len(self.operators),
+                'layers': self.layers,
+                'grounding_time': self.grounding_time}
+
+def reachable_pairs(task, init):
+    """Returns, for every fact of the task, the set of facts that can be true at the same time as it
+    (h^2 reachability: ignoring everything but pairs of facts). Two facts that are not in each other's
+    set are mutex: no reachable state has both.
+    :param task: GroundTask.
+    :param init: Atoms of the initial state.
+    """
+    n = len(task.facts)
+    init = [task.index[a] for a in init if a in task.index]
+    pairs = [set() for _ in range(n)]
+    for i in init:
+        pairs[i].update(init)
+    everything = set(range(n))
+    ops = [(op.pre, set(op.add), set(op.add) | set(op.delete)) for op in task.operators]
+
+    changed = True
+    while changed:
+        changed = False
+        for pre, add, touched in ops:
+            if any(not pairs[i].issuperset(pre) for i in pre):
+                continue
+            # Facts that can be true with all the preconditions and that the operator leaves as they are.
+            others = set.intersection(*[pairs[i] for i in pre]) if pre else set(everything)
+            others -= touched
+            others |= add
+            for p in add:
+                new = others - pairs[p]
+                if new:
+                    changed = True
+                    pairs[p] |= new
+                    for q in new:
+                        pairs[q].add(p)
+
+    return pairs
@@ -0,0 +1,126 @@
+from heapq import heapify, heappop, heappush
+from math import inf
+from grounding import GroundTask
+
+class RelaxedHeuristic:
+    """Base class of the delete-relaxation heuristics. They use the operators of the ground task,
+    and each evaluation computes the cost of every fact with a generalized Dijkstra."""
+    def __init__(self, planner):
+        """
+        :param planner: Root planner of the search. If it has no ground task, the problem is grounded.
+        """
+        task = planner.task if planner.task is not None else GroundTask(planner.domain, planner.problem)
+        self.task = task
+        self.goal = frozenset(task.goal) if task.goal_reachable else None
+        self.pre_of = [[] for _ in task.facts] # Operators that have every fact as precondition.
+        self.no_pre = [] # Operators without preconditions.
+
+        for op, operator in enumerate(task.operators):
+            for fact in operator.pre:
+                self.pre_of[fact].append(op)
+            if not operator.pre:
+                self.no_pre.append(op)
+
+    def combine(self, a, b):
+        """Combines the costs of two preconditions of an operator."""
+        raise NotImplementedError
+
+    def costs(self, state, until_goal=True):
+        """Returns two lists: the relaxed cost of every fact, and the index of its best achiever.
+        :param state: Frozenset of ground atoms.
+        :param until_goal: Whether to stop once the goals have their costs. Otherwise, the costs of all
+            the facts are computed.
+        """
+        operators = self.task.operators
+        cost = [inf] * len(self.task.facts)
+        achiever = [None] * len(self.task.facts)
+        unsatisfied = [len(op.pre) for op in operators]
+        op_cost = [0] * len(operators)
+        heap = []
+        for atom in state:
+            fact = self.task.index[atom]
+            cost[fact] = 0
+            heap.append((0, fact))
+        heapify(heap)
+        goals_left = sum(1 for g in self.goal if cost[g] != 0) if until_goal else inf
+
+        for op in self.no_pre:
+            self._fire(op, 0, cost, achiever, heap)
+
+        while heap and goals_left:
+            c, fact = heappop(heap)
+            if c > cost[fact]:
+                continue
+            if c > 0 and fact in self.goal:
+                goals_left -= 1
+            for op in self.pre_of[fact]:
+                unsatisfied[op] -= 1
+                op_cost[op] = self.combine(op_cost[op], c)
+                if unsatisfied[op] == 0:
+                    self._fire(op, op_cost[op], cost, achiever, heap)
+
+        return cost, achiever
+
+    def _fire(self, op, c, cost, achiever, heap):
+        """Updates the cost of the facts added by an operator whose preconditions cost c."""
+        c += 1
+        for fact in self.task.operators[op].add:
+            if c < cost[fact]:
+                cost[fact] = c
+                achiever[fact] = op
+                heappush(heap, (c, fact))
+
+    def __call__(self, state):
+        """Returns the heuristic value of the state, inf if the goal is not relaxed reachable.
+        :param state: Frozenset of ground atoms.
+        """
+        raise NotImplementedError
+
+class HMax(RelaxedHeuristic):
+    """h_max: cost of the most expensive goal. It's admissible."""
+    def combine(self, a, b):
+        return max(a, b)
+
+    def __call__(self, state):
+        if self.goal is None:
+            return inf
+        cost, _ = self.costs(state)
+        return max((cost[g] for g in self.goal), default=0)
+
+class HAdd(RelaxedHeuristic):
+    """h_add: sum of the costs of the goals, assuming they are independent."""
+    def combine(self, a, b):
+        return a + b
+
+    def __call__(self, state):
+        if self.goal is None:
+            return inf
+        cost, _ = self.costs(state)
+        return sum(cost[g] for g in self.goal)
+
+class HFF(HAdd):
+    """h_FF: number of operators of a relaxed plan extracted with the best supporters of h_add."""
+    def __call__(self, state):
+        if self.goal is None:
+            return inf
+        cost, achiever = self.costs(state)
+        relaxed_plan = set()
+        pending = [g for g in self.goal if cost[g] != 0]
+        done = set(pending)
+
+        while pending:
+            fact = pending.pop()
+            op = achiever[fact]
+            if op is None:
+                return inf
+            if op in relaxed_plan:
+                continue
+            relaxed_plan.add(op)
+            for pre in self.task.operators[op].pre:
+                if cost[pre] != 0 and pre not in done:
+                    done.add(pre)
+                    pending.append(pre)
+
+        return len(relaxed_plan)
+
+HEURISTICS = {'hmax': HMax, 'hadd': HAdd, 'hff': HFF}
@@ -0,0 +1,189 @@
+from array import array
+from collections import deque
+from predicate import Not
+
+MAX_CANDIDATES = 1000 # Maximum number of candidate invariants examined by synthesize_invariants.
+
+def _balanced(invariant, action):
+    """Checks that the action can't make two atoms of the invariant true with the same parameters.
+    Returns None if it can't, or the effect (name, variables) that is not balanced by a delete effect.
+    If the action adds more than one atom of the invariant, it returns False: adding more patterns
+    doesn't help.
+    :param invariant: Dictionary that maps the name of every predicate of the invariant to the positions
+        of its parameters.
+    :param action: Action to check.
+    """
+    pre = {(p.declaration.name, tuple(v.name for v in p.variables)) for p in action.preconditions}
+    adds = []
+    deletes = []
+    for e in action.effects:
+        if e.declaration.name in invariant:
+            effect = (e.declaration.name, tuple(v.name for v in e.variables))
+            (deletes if type(e) is Not else adds).append(effect)
+
+    if len(adds) > 1:
+        return False
+    for name, variables in adds:
+        params = tuple(variables[i] for i in invariant[name])
+        # The atom deleted must be a precondition, so that it's true before the action and the number
+        # of atoms of the invariant that are true doesn't grow.
+        if not any(tuple(dv[i] for i in invariant[dn]) == params and (dn, dv) in pre for dn, dv in deletes):
+            return name, variables
+    return None
+
+def _refinements(invariant, action, effect):
+    """Yields the invariants that add to the given one a precondition of the action that it deletes,
+    with the variables of the parameters of the effect as parameters, so that it balances the effect.
+    :param invariant: Dictionary that maps the name of every predicate to the positions of its parameters.
+    :param action: Action with the unbalanced effect.
+    :param effect: Pair (name, variables) of the add effect.
+    """
+    name, variables = effect
+    params = [variables[i] for i in invariant[name]]
+    pre = {(p.declaration.name, tuple(v.name for v in p.variables)) for p in action.preconditions}
+    for e in action.effects:
+        if type(e) is not Not or e.declaration.name in invariant:
+            continue
+        dv = tuple(v.name for v in e.variables)
+        if (e.declaration.name, dv) not in pre or not all(v in dv for v in params):
+            continue
+        positions = tuple(dv.index(v) for v in params)
+        if len(dv) - len(positions) <= 1: # At most one counted argument.
+            yield {**invariant, e.declaration.name: positions}
+
+def synthesize_invariants(domain):
+    """Returns the invariants of the domain that hold in every state reachable from an initial state
+    where they hold: sets of predicates with some of their arguments as parameters, such that for every
+    value of the parameters at most one atom of the set is true.
+
+    Every predicate starts as a candidate with all its arguments but one as parameters. A candidate is
+    kept if every action that adds one of its atoms also deletes, as a precondition, another one with the
+    same parameters. If an action doesn't, the candidate is refined with every predicate that the action
+    deletes with those parameters, like 'free ?k' with 'holding ?k ?c', which a put-down deletes.
+    Every invariant is a dictionary that maps the name of every predicate to the positions of its parameters.
+    :param domain: Domain of the world.
+    """
+    queue = deque()
+    for fact in domain.predicates:
+        n = len(fact.variables)
+        if n <= 1:
+            queue.append({fact.name: tuple(range(n))})
+        else:
+            for counted in range(n):
+                queue.append({fact.name: tuple(i for i in range(n) if i != counted)})
+
+    seen = set()
+    invariants = []
+    while queue and len(seen) < MAX_CANDIDATES:
+        invariant = queue.popleft()
+        key = frozenset(invariant.items())
+        if key in seen:
+            continue
+        seen.add(key)
+
+        for action in domain.actions:
+            effect = _balanced(invariant, action)
+            if effect is not None:
+                if effect:
+                    queue.extend(_refinements(invariant, action, effect))
+                break
+        else:
+            invariants.append(invariant)
+
+    return invariants
+
+class FiniteDomainEncoding:
+    """Compact encoding of the states of a ground task as vectors of small integers.
+
+    Every invariant of the domain is instantiated over the facts of the task, giving mutex groups: sets
+    of facts of which at most one is true, like the stacks where a container can be or the containers an
+    arm can hold. The groups are chosen greedily, the largest first, until every fact that can change is
+    in one, and every group becomes a finite-domain variable whose value is the fact that is true, or
+    'none'. A group whose initial state has exactly one true fact, and where every operator that deletes
+    a fact adds another, never takes the value 'none' (like the stack where a container is, or the
+    container at the top of a stack). The facts that no operator changes are not stored.
+
+    A state is encoded as the bytes of an array with one value per variable, one byte each unless some
+    variable has more than 256 values, so it can be used as a key of a visited set."""
+    def __init__(self, task, domain, init):
+        """
+        :param task: GroundTask of the problem.
+        :param domain: Domain of the world, where the invariants are synthesized.
+        :param init: Atoms of the initial state.
+        """
+        changed = set()
+        for op in task.operators:
+            changed.update(op.add)
+            changed.update(op.delete)
+        init = {task.index[a] for a in init if a in task.index}
+        self.static = frozenset(task.facts[f] for f in init if f not in changed) # Facts that are always true.
+
+        self.invariants = synthesize_invariants(domain)
+        groups = []
+        for invariant in self.invariants:
+            by_params = {}
+            for f in changed:
+                atom = task.facts[f]
+                positions = invariant.get(atom.name)
+                if positions is not None:
+                    by_params.setdefault(tuple(atom.args[i] for i in positions), []).append(f)
+            if any(len(init.intersection(group)) > 1 for group in by_params.values()):
+                continue # The invariant doesn't hold in the initial state.
+            groups.extend(sorted(group) for group in by_params.values() if len(group) > 1)
+
+        exactly_one = set()
+        for i, group in enumerate(groups):
+            facts = set(group)
+            if len(init & facts) == 1 and all(facts.isdisjoint(op.delete) or not facts.isdisjoint(op.add)
+                                              for op in task.operators):
+                exactly_one.add(i)
+
+        self.variables = [] # Facts of every variable, indexed by their value.
+        self.has_none = [] # Whether every variable can be 'none', whose value is the number of facts of the variable.
+        covered = set()
+        pending = list(range(len(groups)))
+        while pending:
+            i = max(pending, key=lambda i: (sum(1 for f in groups[i] if f not in covered), -i))
+            pending.remove(i)
+            group = [f for f in groups[i] if f not in covered]
+            if len(group) <= 1:
+                break
+            self.variables.append([task.facts[f] for f in group])
+            self.has_none.append(i not in exactly_one or len(group) < len(groups[i]))
+            covered.update(group)
+        for f in sorted(changed - covered):
+            self.variables.append([task.facts[f]])
+            self.has_none.append(True)
+
+        self.var_of = {atom: (x, value) for x, facts in enumerate(self.variables) for value, atom in enumerate(facts)}
+        self.typecode = 'B' if all(len(facts) < 256 for facts in self.variables) else 'H'
+        self.default = array(self.typecode, [len(facts) if none else 0
+                                             for facts, none in zip(self.variables, self.has_none)])
+
+    def __len__(self):
+        return len(self.variables)
+
+    def __str__(self):
+        groups = sum(1 for facts in self.variables if len(facts) > 1)
+        return (f'{len(self.variables)} variables ({groups} mutex groups, {len(self.variables) - groups} binary), '
+                f'{len(self.default.tobytes())} bytes per state')
+
+    def encode(self, state):
+        """Returns the bytes of the vector of values of the state.
+        :param state: Frozenset of ground atoms.
+        """
+        values = array(self.typecode, self.default)
+        var_of = self.var_of
+        for atom in state:
+            x = var_of.get(atom)
+            if x is not None:
+                values[x[0]] = x[1]
+        return values.tobytes()
+
+    def decode(self, key):
+        """Returns the state, as a frozenset of ground atoms, of the bytes of a vector of values.
+        :param key: Bytes returned by encode.
+        """
+        values = array(self.typecode)
+        values.frombytes(key)
+        return self.static.union(facts[v] for facts, v in zip(self.variables, values) if v < len(facts))
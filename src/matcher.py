@@ -0,0 +1,99 @@
+from weakref import WeakKeyDictionary
+from predicate import Not
+
+class StateIndex:
+    """Index of a state by predicate name and by (predicate name, argument position, object name)."""
+    def __init__(self, state):
+        """
+        :param state: Iterable of ground atoms.
+        """
+        by_name = {}
+        by_arg = {}
+
+        for atom in state:
+            by_name.setdefault(atom.name, []).append(atom)
+            for pos, value in enumerate(atom.args):
+                by_arg.setdefault((atom.name, pos, value), []).append(atom)
+
+        self.by_name = by_name
+        self.by_arg = by_arg
+
+    def candidates(self, name, bound):
+        """Returns the atoms with the given name that may agree with the bound arguments.
+        Only the most selective bound position is used, the rest must be checked by the caller.
+        :param name: Name of the predicate.
+        :param bound: List of pairs (position, object name) already fixed by the binding.
+        """
+        best = self.by_name.get(name, ())
+        for key in bound:
+            atoms = self.by_arg.get((name,) + key, ())
+            if len(atoms) < len(best):
+                best = atoms
+        return best
+
+_join_orders = WeakKeyDictionary() # Cache of the order in which the preconditions of every action are joined.
+
+def join_order(action):
+    """Returns the positions of the preconditions of the action in the order they will be joined.
+    Greedily, the next precondition is the one with more variables already bound by the previous ones.
+    :param action: Action to order.
+    """
+    order = _join_orders.get(action)
+    if order is None:
+        order = []
+        bound = set()
+        pending = list(range(len(action.preconditions)))
+        while pending:
+            best = max(pending, key=lambda i: sum(v.name in bound for v in action.preconditions[i].variables))
+            pending.remove(best)
+            order.append(best)
+            bound.update(v.name for v in action.preconditions[best].variables)
+        order = _join_orders[action] = tuple(order)
+    return order
+
+def match(action, index, types):
+    """Returns the list of tuples of ground atoms, in the order of the action's preconditions,
+    with which the action can be applied.
+    :param action: Action to match.
+    :param index: StateIndex of the state.
+    :param types: Dictionary that maps the name of every object to its type.
+    """
+    preconditions = action.preconditions
+    if any(type(p) is Not for p in preconditions):
+        # Only STRIPS preconditions are supported, as in Planner.verify_action.
+        return []
+
+    order = join_order(action)
+    matches = []
+    chosen = [None] * len(preconditions)
+
+    def extend(step, binding):
+        if step == len(order):
+            matches.append(tuple(chosen))
+            return
+
+        pos_pre = order[step]
+        pre = preconditions[pos_pre]
+        bound = [(i, binding[v.name]) for i, v in enumerate(pre.variables) if v.name in binding]
+
+        for atom in index.candidates(pre.declaration.name, bound):
+            if len(atom.args) != len(pre.variables) or atom in chosen:
+                continue
+            new_binding = binding
+            for v, value in zip(pre.variables, atom.args):
+                current = new_binding.get(v.name)
+                if current is None:
+                    if types.get(value) != v.type:
+                        break
+                    if new_binding is binding:
+                        new_binding = dict(binding)
+                    new_binding[v.name] = value
+                elif current != value:
+                    break
+            else:
+                chosen[pos_pre] = atom
+                extend(step + 1, new_binding)
+                chosen[pos_pre] = None
+
+    extend(0, {})
+    return matches
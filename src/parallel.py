@@ -0,0 +1,187 @@
+import logging
+import multiprocessing
+import queue
+import traceback
+from engine import SearchEngine
+from grounding import GroundTask
+from planner import Planner
+
+logger = logging.getLogger(__name__)
+
+BATCH = 512 # Number of successors sent together to the worker that owns them.
+
+class WorkerError(Exception):
+    """Raised by the coordinator when a worker fails. Its message is the traceback of the worker."""
+    pass
+
+def _worker(me, n, domain, problem, task, init, inboxes, commands, results):
+    """Process that owns the states whose key hashes to me. If it fails, it sends the traceback of the
+    error, as a WorkerError, to the coordinator.
+    :param me: Number of this worker.
+    :param n: Number of workers.
+    :param domain: Domain of the world.
+    :param problem: Problem to solve.
+    :param task: GroundTask of the root planner, the same in all the workers.
+    :param init: State of the root planner.
+    :param inboxes: Queues where every worker receives the successors it owns.
+    :param commands: Queue where this worker receives the commands of the coordinator.
+    :param results: Queue where the workers answer the coordinator.
+    """
+    try:
+        _own(me, n, domain, problem, task, init, inboxes, commands, results)
+    except Exception:
+        results.put(WorkerError(f'Worker {me} failed:\n{traceback.format_exc()}'))
+
+def _own(me, n, domain, problem, task, init, inboxes, commands, results):
+    """Body of _worker.
+
+    Every state is identified by its key: the sorted tuple with the indices of its facts in the
+    ground task. All the workers receive the task of the coordinator, so they agree on the keys and on
+    the indices of the operators."""
+    op_ids = {(op.action, op.predicates): i for i, op in enumerate(task.operators)}
+    goal_facts = set(task.goal) if task.goal_reachable else None
+    parents = {} # Dictionary that maps every state owned by this worker to (parent key, operator index).
+    frontier = []
+
+    root = tuple(sorted(task.index[a] for a in init))
+    if hash(root) % n == me:
+        parents[root] = (None, None)
+        frontier.append(root)
+
+    while True:
+        command = commands.get()
+
+        if command[0] == 'expand':
+            batches = [[] for _ in range(n)]
+            generated = 0
+            for key in frontier:
+                v = Planner(domain, problem, frozenset(task.facts[i] for i in key), task)
+                actions = v.applicable_actions()
+                for a in actions:
+                    for pred in actions[a]:
+                        p = v.apply_action(a, pred)
+                        generated += 1
+                        child = tuple(sorted(task.index[x] for x in p.state))
+                        owner = hash(child) % n
+                        batches[owner].append((child, key, op_ids[(a, pred)]))
+                        if len(batches[owner]) >= BATCH:
+                            inboxes[owner].put(batches[owner])
+                            batches[owner] = []
+            for owner in range(n):
+                if batches[owner]:
+                    inboxes[owner].put(batches[owner])
+                inboxes[owner].put(None) # This worker finished the layer.
+
+            expanded = len(frontier)
+            frontier = []
+            goal = None
+            duplicates = 0
+            finished = 0
+            while finished < n:
+                batch = inboxes[me].get()
+                if batch is None:
+                    finished += 1
+                    continue
+                for child, key, op in batch:
+                    if child in parents:
+                        duplicates += 1
+                    else:
+                        parents[child] = (key, op)
+                        frontier.append(child)
+                        if goal is None and goal_facts is not None and goal_facts.issubset(child):
+                            goal = child
+            results.put((me, len(frontier), goal, expanded, generated, duplicates))
+
+        elif command[0] == 'parent':
+            results.put(parents[command[1]])
+
+        elif command[0] == 'stop':
+            return
+
+def _get(results, processes):
+    """Returns the next answer of the workers. Raises WorkerError if a worker failed or died."""
+    while True:
+        try:
+            answer = results.get(timeout=1)
+        except queue.Empty:
+            dead = [i for i, process in enumerate(processes) if not process.is_alive()]
+            if dead:
+                raise WorkerError(f'Worker {dead[0]} died with exit code {processes[dead[0]].exitcode}.')
+            continue
+        if isinstance(answer, WorkerError):
+            raise answer
+        return answer
+
+class ParallelBFS(SearchEngine):
+    """Hash-distributed BFS. Every worker process owns the states whose hash maps to it, expands them
+    and sends the successors, in batches, to the workers that own them. The layers are synchronized,
+    so the plan has the same length as the one found by a sequential BFS without pruning."""
+    def __init__(self, planner, workers=None, stats=None):
+        """
+        :param planner: Root planner.
+        :param workers: Number of worker processes. By default, the number of cores.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+            Only the counters and the progress of every layer are recorded: the successors are
+            generated by the workers.
+        """
+        super().__init__(planner, stats)
+        self.workers = workers or multiprocessing.cpu_count()
+
+    def _search(self, stats):
+        root = self.planner
+        if root.is_goal():
+            return root
+
+        domain, problem, n = root.domain, root.problem, self.workers
+        task = root.task if root.task is not None else GroundTask(domain, problem)
+        inboxes = [multiprocessing.Queue() for _ in range(n)]
+        commands = [multiprocessing.Queue() for _ in range(n)]
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=_worker, daemon=True,
+                                             args=(i, n, domain, problem, task, root.state, inboxes, commands[i], results))
+                     for i in range(n)]
+        for process in processes:
+            process.start()
+
+        try:
+            level = 0
+            while True:
+                level += 1
+                logger.info('Level of exploration: %d', level)
+                for c in commands:
+                    c.put(('expand',))
+                answers = [_get(results, processes) for _ in range(n)]
+                for _, _, _, expanded, generated, duplicates in answers:
+                    stats.expanded += expanded
+                    stats.generated += generated
+                    stats.duplicates += duplicates
+                stats.progress(sum(size for _, size, _, _, _, _ in answers), level=level)
+                goals = [goal for _, _, goal, _, _, _ in answers if goal is not None]
+                if goals:
+                    return self._plan(min(goals), task, commands, results, processes)
+                if all(size == 0 for _, size, _, _, _, _ in answers):
+                    return -1
+        finally:
+            for c in commands:
+                c.put(('stop',))
+            for process in processes:
+                process.join(1)
+                if process.is_alive():
+                    process.kill() # It failed, or it's blocked sending to a worker that failed.
+
+    def _plan(self, key, task, commands, results, processes):
+        """Rebuilds the plan that reaches the state with the given key asking every state's owner for
+        its parent, and returns the last planner of the plan."""
+        n = len(commands)
+        ops = []
+        while True:
+            commands[hash(key) % n].put(('parent', key))
+            key, op = _get(results, processes)
+            if key is None:
+                break
+            ops.append(task.operators[op])
+
+        p = self.planner
+        for op in reversed(ops):
+            p = p.apply_action(op.action, op.predicates)
+        return p
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import pickle
+import re
+import sys
+from action import Action
+from domain import Domain
+from grounding import GroundTask
+from predicate import Fact, Not, Object
+from problem import Problem
+from variable import Variable
+
+_TOKEN = re.compile(r'\(|\)|[^\s()]+')
+_COMMENT = re.compile(r';[^\n]*')
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pddl-planner') # Default directory of the task cache.
+
+def _source_hash():
+    """Returns the SHA-256 of the source of this parser and of the modules whose objects are cached, so that
+    the cache entries made by another version of them are never loaded."""
+    sha = hashlib.sha256()
+    for name in (__name__,) + tuple(c.__module__ for c in (Action, Domain, GroundTask, Fact, Problem, Variable)):
+        with open(sys.modules[name].__file__, 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest().encode()
+
+CACHE_VERSION = _source_hash() # Part of the key of every cache entry.
+
+def parse_sexp(text):
+    """Returns the PDDL text as nested lists of lowercase tokens. It runs in linear time.
+    :param text: PDDL text with exactly one expression.
+    """
+    stack = [[]]
+
+    for token in _TOKEN.findall(_COMMENT.sub('', text).lower()):
+        if token == '(':
+            stack.append([])
+        elif token == ')':
+            if len(stack) == 1:
+                raise Exception('Unbalanced parentheses: there is an extra ")".')
+            expression = stack.pop()
+            stack[-1].append(expression)
+        else:
+            stack[-1].append(token)
+
+    if len(stack) != 1:
+        raise Exception('Unbalanced parentheses: there are missing ")".')
+    if len(stack[0]) != 1:
+        raise Exception('The text must have exactly one expression.')
+    return stack[0][0]
+
+def _typed_list(items):
+    """Returns a list of pairs (name, type) from a PDDL typed list, like [a, b, -, t, c].
+    Names without type have the type object."""
+    result = []
+    names = []
+    i = 0
+
+    while i < len(items):
+        if items[i] == '-':
+            if i + 1 == len(items) or isinstance(items[i + 1], list):
+                raise Exception(f'Expected a type after "-" in {items}.')
+            result.extend((name, items[i + 1]) for name in names)
+            names = []
+            i += 2
+        else:
+            names.append(items[i])
+            i += 1
+
+    result.extend((name, 'object') for name in names)
+    return result
+
+def _header(tree, kind):
+    """Checks that the tree is (define (kind name) ...) and returns the name."""
+    if not isinstance(tree, list) or len(tree) < 2 or tree[0] != 'define' \
+            or not isinstance(tree[1], list) or len(tree[1]) != 2 or tree[1][0] != kind:
+        raise Exception(f'Expected (define ({kind} <name>) ...).')
+    return tree[1][1]
+
+def _atom(expression, facts, args):
+    """Returns the predicate of a PDDL atom, like (on ?c ?p).
+    :param expression: Atom as a list of tokens.
+    :param facts: Dictionary that maps the names of the predicates to their declarations.
+    :param args: Dictionary that maps the names of the variables or objects to their instances.
+    """
+    if expression[0] not in facts:
+        raise Exception(f'Unknown predicate {expression[0]}.')
+    fact = facts[expression[0]]
+    if len(expression) - 1 != len(fact.variables):
+        raise Exception(f'The predicate {fact.name} takes {len(fact.variables)} arguments: {expression}.')
+    for a in expression[1:]:
+        if a not in args:
+            raise Exception(f'Unknown argument {a} in {expression}.')
+    return fact(*[args[a] for a in expression[1:]])
+
+def _conjunction(expression, facts, args, negation=True):
+    """Returns the list of predicates (and negations, if they are allowed) of a PDDL conjunction."""
+    if not expression:
+        return []
+    items = expression[1:] if expression[0] == 'and' else [expression]
+    result = []
+
+    for item in items:
+        if item[0] == 'not':
+            if not negation:
+                raise Exception(f'Negations are not supported here: {item}.')
+            result.append(Not(_atom(item[1], facts, args)))
+        else:
+            result.append(_atom(item, facts, args))
+
+    return result
+
+def _action(section, facts):
+    """Returns the action of a PDDL (:action ...) section."""
+    fields = dict(zip(section[2::2], section[3::2]))
+    parameters = [Variable(name, tipo) for name, tipo in _typed_list(fields.get(':parameters', []))]
+    variables = [Variable(name, tipo) for name, tipo in _typed_list(fields.get(':vars', []))]
+    args = {v.name: v for v in parameters + variables}
+    preconditions = _conjunction(fields.get(':precondition', []), facts, args, negation=False)
+
+    # The planner takes the values of the variables from the atoms that match the preconditions.
+    bound = {v.name for p in preconditions for v in p.variables}
+    unbound = [name for name in args if name not in bound]
+    if unbound:
+        raise Exception(f'The parameters {", ".join(unbound)} of the action {section[1]} are not in any '
+                        'precondition. Every parameter must appear in a precondition.')
+
+    return Action(section[1], parameters, variables, preconditions,
+                  _conjunction(fields.get(':effect', []), facts, args))
+
+def parse_domain(text):
+    """Returns the domain of a PDDL domain text.
+    :param text: Text with (define (domain ...) ...).
+    """
+    tree = parse_sexp(text)
+    name = _header(tree, 'domain')
+    types = []
+    predicates = []
+    facts = {}
+    actions = []
+
+    for section in tree[2:]:
+        if section[0] == ':requirements':
+            continue
+        elif section[0] == ':types':
+            for tipo, parent in _typed_list(section[1:]):
+                if parent != 'object':
+                    raise Exception(f'Type hierarchies are not supported: {tipo} - {parent}.')
+                types.append(tipo)
+        elif section[0] == ':predicates':
+            for p in section[1:]:
+                fact = Fact(p[0], [Variable(v, tipo) for v, tipo in _typed_list(p[1:])])
+                predicates.append(fact)
+                facts[fact.name] = fact
+        elif section[0] == ':action':
+            actions.append(_action(section, facts))
+        else:
+            raise Exception(f'Unsupported section {section[0]} in the domain {name}.')
+
+    return Domain(name, types, predicates, actions)
+
+def parse_problem(text, domain):
+    """Returns the problem of a PDDL problem text.
+    :param text: Text with (define (problem ...) ...).
+    :param domain: Domain of the problem.
+    """
+    tree = parse_sexp(text)
+    name = _header(tree, 'problem')
+    facts = {p.name: p for p in domain.predicates}
+    objects = {}
+    init = []
+    goal = []
+
+    for section in tree[2:]:
+        if section[0] == ':domain':
+            if section[1] != domain.name:
+                raise Exception(f'The problem {name} is for the domain {section[1]}, not {domain.name}.')
+        elif section[0] == ':objects':
+            objects = {o: Object(o, tipo) for o, tipo in _typed_list(section[1:])}
+        elif section[0] == ':init':
+            init = [_atom(a, facts, objects) for a in section[1:]]
+        elif section[0] == ':goal':
+            goal = _conjunction(section[1], facts, objects, negation=False)
+        else:
+            raise Exception(f'Unsupported section {section[0]} in the problem {name}.')
+
+    return Problem(name, domain, list(objects.values()), init, goal)
+
+def load_domain(path):
+    """Returns the domain of a PDDL domain file.
+    :param path: Path of the file.
+    """
+    with open(path) as f:
+        return parse_domain(f.read())
+
+def load_problem(path, domain):
+    """Returns the problem of a PDDL problem file.
+    :param path: Path of the file.
+    :param domain: Domain of the problem.
+    """
+    with open(path) as f:
+        return parse_problem(f.read(), domain)
+
+def load_task(domain_path, problem_path, cache_dir=CACHE_DIR):
+    """Returns the domain, the problem and the ground task of the given PDDL files.
+    The three of them are stored in the cache directory, keyed by the hash of the contents of
+    the files, so the next time the same files are loaded they are neither parsed nor grounded.
+    :param domain_path: Path of the domain file.
+    :param problem_path: Path of the problem file.
+    :param cache_dir: Directory of the cache. If it's None, the cache is not used.
+    """
+    with open(domain_path, 'rb') as f:
+        domain_text = f.read()
+    with open(problem_path, 'rb') as f:
+        problem_text = f.read()
+
+    if cache_dir is not None:
+        key = hashlib.sha256(CACHE_VERSION + b'\0' + domain_text + b'\0' + problem_text).hexdigest()
+        path = os.path.join(cache_dir, key + '.pickle')
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    return pickle.load(f)
+            except Exception:
+                pass # A corrupted entry is built again.
+
+    domain = parse_domain(domain_text.decode())
+    problem = parse_problem(problem_text.decode(), domain)
+    task = GroundTask(domain, problem)
+
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as f:
+            pickle.dump((domain, problem, task), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+
+    return domain, problem, task
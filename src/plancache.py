@@ -0,0 +1,216 @@
+import hashlib
+import json
+import os
+import sqlite3
+from time import perf_counter, time
+from pddl import CACHE_DIR
+from predicate import Atom
+
+PLAN_CACHE = os.path.join(CACHE_DIR, 'plans.sqlite') # Default file of the plan cache.
+
+def _refine(color, atoms):
+    """Refines the colors of the objects until they are stable: two objects keep the same color only if
+    they appear in the same atoms, at the same positions, with objects of the same colors.
+    :param color: Dictionary that maps every object to an integer.
+    :param atoms: List of (source, name, args), where source says if the atom is in the initial state or the goal.
+    """
+    while True:
+        signature = {o: [] for o in color}
+        for source, name, args in atoms:
+            context = tuple(color[x] for x in args)
+            for position, x in enumerate(args):
+                signature[x].append((source, name, position, context))
+        keys = {o: (color[o], tuple(sorted(signature[o]))) for o in color}
+        ranks = {k: i for i, k in enumerate(sorted(set(keys.values())))}
+        new = {o: ranks[keys[o]] for o in color}
+        if len(ranks) == len(set(color.values())):
+            return new
+        color = new
+
+MAX_LEAVES = 256 # Maximum number of colorings compared by canonical_names.
+
+def _leaves(color, atoms, budget):
+    """Yields the colorings where every object has its own color that are reached from the given one by
+    individualization and refinement: the first color shared by many objects is split by giving each
+    of them, in turn, a new color, and every branch is refined and split again.
+    :param color: Dictionary that maps every object to an integer, refined by _refine.
+    :param atoms: List of (source, name, args), as in _refine.
+    :param budget: List with the number of colorings that can still be yielded. The first one always is.
+    """
+    classes = {}
+    for o in sorted(color):
+        classes.setdefault(color[o], []).append(o)
+    tied = min((c for c in classes if len(classes[c]) > 1), default=None)
+    if tied is None:
+        budget[0] -= 1
+        yield color
+        return
+    for i, o in enumerate(classes[tied]):
+        if i and budget[0] <= 0:
+            return
+        yield from _leaves(_refine({**color, o: len(classes)}, atoms), atoms, budget)
+
+def canonical_names(problem):
+    """Returns a dictionary that maps every object of the problem to a name that doesn't depend on the
+    original names, only on the types of the objects and on the atoms where they appear, so problems
+    that are the same up to renaming the objects get the same names.
+
+    The colors of the objects are refined until they are stable and, when some objects can't be told
+    apart, every way of telling them apart by individualization is tried, and the one that gives the
+    smallest renamed atoms is kept. The names are canonical when there are at most MAX_LEAVES ways;
+    otherwise only the first ones are compared, which depend on the original names, so two renamings
+    of a very symmetric problem may get different names (a cache miss, never a wrong hit).
+    :param problem: Problem whose objects are renamed.
+    """
+    types = sorted(set(problem.object_types.values()))
+    color = {o: types.index(problem.object_types[o]) for o in sorted(problem.object_types)}
+    atoms = [('init', a.name, a.args) for a in problem.init_atoms] + \
+            [('goal', a.name, a.args) for a in problem.goal_atoms]
+    color = _refine(color, atoms)
+
+    certificate = lambda color: sorted((source, name, tuple(color[x] for x in args)) for source, name, args in atoms)
+    color = min(_leaves(color, atoms, [MAX_LEAVES]), key=certificate)
+    return {o: f'o{color[o]}' for o in color}
+
+def fingerprint(domain, problem, names=None):
+    """Returns the key of the task in the cache: the SHA-256 of the domain and of the problem with its
+    objects renamed by canonical_names.
+    :param domain: Domain of the world.
+    :param problem: Problem to solve.
+    :param names: Result of canonical_names(problem), if it's already known.
+    """
+    if names is None:
+        names = canonical_names(problem)
+    rename = lambda atoms: sorted(' '.join([a.name] + [names[x] for x in a.args]) for a in atoms)
+    text = '\n'.join([str(domain),
+                      ' '.join(f'{names[o]}-{problem.object_types[o]}' for o in sorted(names, key=names.get)),
+                      '; '.join(rename(problem.init_atoms)),
+                      '; '.join(rename(problem.goal_atoms))])
+    return hashlib.sha256(text.encode()).hexdigest()
+
+class PlanCache:
+    """Plans already found, stored in a sqlite file and keyed by the fingerprint of their task, so a
+    problem that is the same as one already solved, even with other names for its objects, is solved
+    with a lookup. The plans are stored with the canonical names of the objects and they are renamed
+    back for every problem. A cached plan is replayed before it's returned, so a plan that isn't valid
+    anymore (for example, because the domain file changed without changing its text) is a miss.
+
+    When there are more than max_entries plans, the ones used least recently are removed."""
+    def __init__(self, path=PLAN_CACHE, max_entries=10000):
+        """
+        :param path: File of the cache. It's created if it doesn't exist.
+        :param max_entries: Maximum number of plans kept.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path, timeout=30)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS plans (key TEXT PRIMARY KEY, plan TEXT NOT NULL, used REAL NOT NULL)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS plans_used ON plans (used)')
+        self.hits = 0
+        self.misses = 0
+        self.invalid = 0 # Cached plans that couldn't be replayed. They are removed.
+        self.stored = 0
+        self.evicted = 0
+        self.lookup_time = 0
+
+    def close(self):
+        self.db.close()
+
+    def lookup(self, planner):
+        """Returns the planner that reaches the goal from the planner with the cached plan of its task,
+        or None if there is no valid plan.
+        :param planner: Root planner.
+        """
+        start = perf_counter()
+        names = canonical_names(planner.problem)
+        key = fingerprint(planner.domain, planner.problem, names)
+        row = self.db.execute('SELECT plan FROM plans WHERE key = ?', (key,)).fetchone()
+
+        result = None
+        if row is None:
+            self.misses += 1
+        else:
+            result = self._replay(planner, json.loads(row[0]), {n: o for o, n in names.items()})
+            with self.db:
+                if result is None:
+                    self.invalid += 1
+                    self.db.execute('DELETE FROM plans WHERE key = ?', (key,))
+                else:
+                    self.hits += 1
+                    self.db.execute('UPDATE plans SET used = ? WHERE key = ?', (time(), key))
+
+        self.lookup_time += perf_counter() - start
+        return result
+
+    def _replay(self, planner, steps, objects):
+        """Applies the cached plan from the planner. Returns the last planner if every action is applicable
+        and the goal is reached, or None otherwise.
+        :param steps: List of [action name, preconditions], with every precondition as [name, *args].
+        :param objects: Dictionary that maps the canonical names to the objects of the problem.
+        """
+        actions = {a.name: a for a in planner.domain.actions}
+        task = planner.task
+        p = planner
+        try:
+            for name, preconditions in steps:
+                action = actions[name]
+                predicates = tuple(Atom(pre[0], tuple(objects[x] for x in pre[1:])) for pre in preconditions)
+                if task is not None:
+                    if (action, predicates) not in task.operators_by_match:
+                        return None
+                elif not p.verify_action(action, predicates):
+                    return None
+                if not p.state.issuperset(predicates):
+                    return None
+                p = p.apply_action(action, predicates)
+        except KeyError:
+            return None # An action or an object that this task doesn't have.
+        return p if p.is_goal() else None
+
+    def store(self, planner):
+        """Stores the plan that reaches the planner, which is on the goal.
+        :param planner: Last planner of the plan.
+        """
+        names = canonical_names(planner.problem)
+        key = fingerprint(planner.domain, planner.problem, names)
+        steps = []
+        p = planner
+        while p.father is not None:
+            action, predicates = p.action_taken
+            steps.append([action.name, [[a.name] + [names[x] for x in a.args] for a in predicates]])
+            p = p.father
+        steps.reverse()
+
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO plans VALUES (?, ?, ?)', (key, json.dumps(steps), time()))
+            self.stored += 1
+            extra = self.db.execute('SELECT COUNT(*) FROM plans').fetchone()[0] - self.max_entries
+            if extra > 0:
+                self.db.execute('DELETE FROM plans WHERE key IN (SELECT key FROM plans ORDER BY used LIMIT ?)', (extra,))
+                self.evicted += extra
+
+    def search(self, engine):
+        """Returns the cached plan of the engine's planner, or searches it with the engine and stores it.
+        It returns the planner with the problem already on the goal. Otherwise it will return -1.
+        :param engine: Search engine, as returned by search.make_search.
+        """
+        p = self.lookup(engine.planner)
+        if p is not None:
+            return p
+        p = engine.search()
+        if p != -1:
+            self.store(p)
+        return p
+
+    def stats(self):
+        """Returns a dictionary with the hits, misses and invalid plans of the lookups, the plans stored
+        and evicted, and the time spent in the lookups."""
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'invalid': self.invalid,
+                'stored': self.stored,
+                'evicted': self.evicted,
+                'lookup_time': self.lookup_time}
@@ -1,72 +1,82 @@
-from copy import deepcopy
 from itertools import combinations
-from predicate import Not, Predicate
+from codegen import compile_action
+from matcher import StateIndex
+from predicate import Not
 
 class Planner:
-    """Generates a plan for the given problem."""
-    def __init__(self, domain, problem):
+    """Generates a plan for the given problem.
+    Every planner is a node of the search: the domain and the problem are shared by all of them,
+    and each one only stores its own state, the action that generated it and its father."""
+    __slots__ = ('domain', 'problem', 'task', 'state', 'action_taken', 'father', 'level')
+
+    def __init__(self, domain, problem, state=None, task=None):
         """
         :param domain: Domain of the world.
         :param problem: Problem to solve.
+        :param state: Frozenset of ground atoms that are true in this planner. If it's None, the initial
+            state of the problem is used.
+        :param task: GroundTask of the problem. If it's given, the applicable actions are obtained from its
+            successor generator instead of matching the preconditions of the actions against the state.
         """
         self.domain = domain
         self.problem = problem
-        self.explored = False
+        self.task = task
+        self.state = problem.init_atoms if state is None else state
         self.action_taken = None # Action taken to arrive at this plan. It's a tuple of the form (action, predicates).
         self.father = None # Father of this planner. Applying the action taken stored in the variable action_taken with the parent, we got this planner.
         self.level = 0 # Level from where the problem of this planner was generated in the BFS algorithm. The root has level 0.
 
     def applicable_actions(self):
         """Returns all the actions that can be applied to this planner's problem."""
-        return {action : self.applicable_action(action) for action in self.domain.actions}
+        if self.task is not None:
+            actions = {action : [] for action in self.domain.actions}
+            for op in self.task.applicable(self.state):
+                actions[op.action].append(op.predicates)
+            return actions
+
+        index = StateIndex(self.state)
+        return {action : self.applicable_action(action, index) for action in self.domain.actions}
+
+    def applicable_action(self, action, index=None):
+        """Returns the tuples of ground atoms, in the order of the action's preconditions, with which
+        the action can be applied. The preconditions are joined one at a time over an index of the state,
+        by the match function generated for the action (see codegen.CompiledAction).
+        :param action: Action to check if is applicable.
+        :param index: StateIndex of this planner's state. It's built if it's not given.
+        """
+        if index is None:
+            index = StateIndex(self.state)
+        return compile_action(action).match(index.by_name, index.by_arg, self.problem.object_types)
 
-    def applicable_action(self, action):
-        """Checks whether an action is applicable or not.
+    def applicable_action_by_combinations(self, action):
+        """Same as applicable_action, but checking every combination of atoms of the state with
+        verify_action. It's much slower and it's kept as a reference.
         :param action: Action to check if is applicable.
         """
         preds = [] # List that will contain the possible predicates to use for the given action.
     
         # We get form all the possible combinations using the state of the problem and then, filter those that we don't want.
-        for subset in combinations(self.problem.state, len(action.preconditions)):
+        for subset in combinations(self.state, len(action.preconditions)):
             if self.verify_action(action, subset):
-                preds.append(subset)
+                preds.append(tuple([x for x in subset if x.name == pre.declaration.name][0]
+                                    for pre in action.preconditions))
 
         return preds
 
     def apply_action(self, action, predicates):
-        """Applies an action to the current problem using the given predicates.
-        The given action is assumed to be applicable.
+        """Applies an action to the current state using the given ground atoms.
+        The given action is assumed to be applicable. Only the new state is created, the domain
+        and the problem are shared with this planner.
         :param action: Action to apply.
-        :param predicates: Predicates to use with the action.
+        :param predicates: Ground atoms of the state to use with the action, in the order of its preconditions.
         """
-        dicc = {} # Dictionary that maps the variable names of the action's preconditions to the names of the given predicates.
-        new_planner = Planner(self.domain, deepcopy(self.problem)) # New planner that will contain the effects of the given action.
-        new_predicates = deepcopy(action.effects)
-
-        # We form the dictionary with the mapped variables.
-        for pred in action.preconditions:
-            temp = [x for x in predicates if x.declaration.name == pred.declaration.name][0]
-            for i in range(len(pred.variables)):
-                dicc[pred.variables[i].name] = temp.variables[i]
-
-        # We form the new predicates using the effects of the action.
-        for e in new_predicates:
-            if type(e) is Not:
-                variables = e.predicate.variables
-            else:
-                variables = e.variables
-
-            for i in range(len(variables)):
-                variables[i] = dicc[variables[i].name]
-
-        # We eliminate the preconditions of the action of the new planner.
-        for p in predicates:
-            new_planner.problem.state.remove(p)
-
-        # We add the predicates caused by action effects to the new planner.
-        for p in new_predicates:
-            new_planner.problem.state.append(p)
+        if self.task is not None:
+            op = self.task.operators_by_match[(action, predicates)]
+            state = self.state.difference(op.delete_atoms).union(op.add_atoms)
+        else:
+            state = compile_action(action).apply(self.state, predicates)
 
+        new_planner = Planner(self.domain, self.problem, state, self.task)
         new_planner.action_taken = (action, predicates)
         new_planner.father = self
         new_planner.level = self.level + 1
@@ -77,11 +87,7 @@ class Planner:
         """"
         Checks if the state is the same as the goal.
         """
-        for predicado in self.problem.goal:
-            if not(predicado in self.problem.state):
-                return False
-
-        return True
+        return self.problem.goal_atoms <= self.state
 
     def how_many_goals(self):
         """"
@@ -95,13 +101,7 @@ class Planner:
         The actual implementation from the above idea will be on the algorithm that finds the plan.
         This method only returns how many goals has been accomplished.
         """
-        number_of_goals = 0
-
-        for predicado in self.problem.goal:
-            if predicado in self.problem.state:
-                number_of_goals += 1
-
-        return number_of_goals
+        return len(self.problem.goal_atoms & self.state)
 
     def obtain_actions(self):
         """Returns, in the form of a chain, the actions that were done to reach the problem of this planner."""
@@ -110,51 +110,61 @@ class Planner:
 
         return self.father.obtain_actions() + f'\n\n{self.action_taken[0].name}: {[str(p) for p in self.action_taken[1]]}'
 
+    def plan(self):
+        """Returns the list of the actions done to reach this planner, starting from the root.
+        Every action is a string with the name of the action and the objects of its parameters and
+        free variables, like (pick-up k1 cc p1 cb)."""
+        steps = []
+        p = self
+        while p.father is not None:
+            action, predicates = p.action_taken
+            binding = {}
+            for pre, atom in zip(action.preconditions, predicates):
+                for v, value in zip(pre.variables, atom.args):
+                    binding[v.name] = value
+            steps.append('({0} {1})'.format(action.name, ' '.join(binding[v.name] for v in action.parameters + action.vars)))
+            p = p.father
+
+        steps.reverse()
+        return steps
+
     def verify_action(self, action, predicates):
-        """"Checks if the given action can be applied using the given predicates.
-        :param dic: Action to work with.
-        :param predicates: List of predicates to verify in the action.
+        """"Checks if the given action can be applied using the given ground atoms.
+        :param action: Action to work with.
+        :param predicates: Tuple of ground atoms to verify in the action.
         """
-        dicc_pred     = {0 : [x for x in predicates if type(x) is Not], 
-                         1 : [x for x in predicates if type(x) is Predicate]}
-        dicc_pred_acc = {0 : [x for x in action.preconditions if type(x) is Not], 
-                         1 : [x for x in action.preconditions if type(x) is Predicate]}
+        names = [x.name for x in predicates]
         aux = {}
 
-        if len(dicc_pred) != len(dicc_pred_acc):
-            return False
-        for i in range(len(dicc_pred)):
-            if len(dicc_pred[i]) != len(dicc_pred_acc[i]):
-                return False
-        for i in range(len(dicc_pred)):
-            temp = [x.declaration.name for x in dicc_pred[i]]
-            for pred in dicc_pred_acc[i]:
-                if not(pred.declaration.name in temp):
-                    return False
-                else:
-                    temp.remove(pred.declaration.name)
-            if len(temp) != 0:
+        # The names of the atoms must be exactly the names of the (positive) preconditions.
+        for pred in action.preconditions:
+            if type(pred) is Not or pred.declaration.name not in names:
                 return False
+            names.remove(pred.declaration.name)
+        if len(names) != 0:
+            return False
 
+        # Every variable of the action must be bound to the same object in all the atoms.
         for a in action.preconditions:
-            pos = 0
-            for v in a.variables:
-                var = None
-                for pred in predicates:
-                    if pred.declaration.name == a.declaration.name:
-                        var = pred.variables[pos]
-                        if v.name not in aux:
-                            aux[v.name] = var.value.name
-                        else:
-                            if pred.variables[pos].value.name != aux[v.name]:
-                                return False
-                pos += 1
+            for pred in predicates:
+                if pred.name == a.declaration.name:
+                    for v, value in zip(a.variables, pred.args):
+                        if aux.setdefault(v.name, value) != value:
+                            return False
         return True
 
     def write_actions(self, path):
-        """Write the actions it takes to reach this planner in a given text file.
+        """Write the actions it takes to reach this planner in a given text file, one at a time.
         :param path: Path to write.
         """
+        chain = []
+        p = self
+        while p.father is not None:
+            chain.append(p.action_taken)
+            p = p.father
+
         f = open(path, 'w')
-        f.write(self.obtain_actions())
+        f.write('Actions to take, starting from the top:')
+        for action, predicates in reversed(chain):
+            f.write(f'\n\n{action.name}: {[str(p) for p in predicates]}')
         f.close()
@@ -0,0 +1,115 @@
+from grounding import reachable_pairs
+
+class StubbornSets:
+    """Partial-order reduction with strong stubborn sets.
+
+    In every state that is not a goal, only the applicable operators of a stubborn set are applied.
+    The set starts with the achievers of a goal fact that is false and it's closed under two rules:
+    for an applicable operator, every operator that interferes with it is added (one deletes a
+    precondition of the other, or they add and delete the same fact), and for an operator that is not
+    applicable, the achievers of one of its false preconditions are added. The orderings of independent
+    operators that are left out lead to the same states, so at least one shortest plan is kept and the
+    search stays complete.
+
+    Two operators whose preconditions have a pair of mutex facts are never applicable in the same
+    state, so they don't interfere. The interference of every operator is computed once, the first
+    time it's needed."""
+    def __init__(self, task, init):
+        """
+        :param task: GroundTask of the problem.
+        :param init: Atoms of the initial state, from where the mutex facts are computed.
+        """
+        self.task = task
+        self.pairs = reachable_pairs(task, init)
+        n = len(task.facts)
+        self.id = {op: i for i, op in enumerate(task.operators)}
+        self.achievers = [[] for _ in range(n)] # Operators that add every fact.
+        self.deleters = [[] for _ in range(n)] # Operators that delete every fact.
+        self.pre_of = [[] for _ in range(n)] # Operators that have every fact as precondition.
+        for i, op in enumerate(task.operators):
+            for f in op.add:
+                self.achievers[f].append(i)
+            for f in op.delete:
+                self.deleters[f].append(i)
+            for f in op.pre:
+                self.pre_of[f].append(i)
+        self.interference = [None] * len(task.operators)
+
+    def interfering(self, i):
+        """Returns the operators that interfere with the operator i."""
+        result = self.interference[i]
+        if result is None:
+            op = self.task.operators[i]
+            result = set()
+            for f in op.pre:
+                result.update(self.deleters[f]) # They disable op.
+            for f in op.delete:
+                result.update(self.pre_of[f]) # Op disables them.
+                result.update(self.achievers[f]) # Op deletes what they add.
+            for f in op.add:
+                result.update(self.deleters[f]) # Op adds what they delete.
+            result.discard(i)
+            pairs = self.pairs
+            operators = self.task.operators
+            result = self.interference[i] = tuple(j for j in result
+                                                  if all(pairs[f].issuperset(operators[j].pre) for f in op.pre))
+        return result
+
+    def stubborn(self, facts, applicable):
+        """Returns the indices of the operators of a strong stubborn set of the state. It stops as soon as
+        the set has all the applicable operators, since then nothing can be pruned.
+        :param facts: Set of the indices of the facts of the state, which is not a goal.
+        :param applicable: Set of the indices of the operators applicable in the state.
+        """
+        goal = next(g for g in self.task.goal if g not in facts)
+        operators = self.task.operators
+        result = set()
+        pending = list(self.achievers[goal])
+        left = len(applicable)
+
+        while pending:
+            i = pending.pop()
+            if i in result:
+                continue
+            result.add(i)
+            if i in applicable:
+                left -= 1
+                if left == 0:
+                    break
+            unsatisfied = next((f for f in operators[i].pre if f not in facts), None)
+            if unsatisfied is None:
+                pending.extend(self.interfering(i))
+            else:
+                pending.extend(self.achievers[unsatisfied])
+
+        return result
+
+    def applicable(self, state):
+        """Returns the operators of the stubborn set that are applicable in the state, and the number of
+        applicable operators left out.
+        :param state: Frozenset of ground atoms.
+        """
+        task = self.task
+        ops = task.applicable(state)
+        if len(ops) < 2 or not task.goal_reachable:
+            return ops, 0
+        facts = {task.index[a] for a in state}
+        if all(g in facts for g in task.goal):
+            return ops, 0
+
+        stubborn = self.stubborn(facts, {self.id[op] for op in ops})
+        kept = [op for op in ops if self.id[op] in stubborn]
+        return kept, len(ops) - len(kept)
+
+    def applicable_actions(self, planner, stats=None):
+        """Same as Planner.applicable_actions, but only with the operators of the stubborn set.
+        :param planner: Planner to expand.
+        :param stats: SearchStatistics where the number of successors left out is added, in reduced.
+        """
+        ops, reduced = self.applicable(planner.state)
+        if stats is not None:
+            stats.reduced += reduced
+        actions = {action : [] for action in planner.domain.actions}
+        for op in ops:
+            actions[op.action].append(op.predicates)
+        return actions
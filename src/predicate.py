@@ -1,4 +1,5 @@
-from copy import deepcopy
+import threading
+from weakref import WeakValueDictionary
 from variable import Variable
 
 class Formula:
@@ -35,7 +36,7 @@ class Fact:
         variables = []
         for var, arg in zip(self.variables, args):
             if isinstance(arg, Object):
-                temp_v = deepcopy(var)
+                temp_v = Variable(var.name, var.type)
                 temp_v.value = arg
                 variables.append(temp_v)
             elif isinstance(arg, Variable):
@@ -72,6 +73,10 @@ class Predicate(Formula):
         return '({0} {1})'.format(self.declaration.name, 
                                     ' '.join(v.value.name if v.value else v.name for v in self.variables))
 
+    def atom(self):
+        """Returns the ground atom of this predicate. All its variables must have a value."""
+        return Atom(self.declaration.name, tuple(v.value.name for v in self.variables))
+
     def __eq__(self, predicate):
         if type(predicate) is Not:
             return False
@@ -99,3 +104,54 @@ class Not(Formula):
             return self.predicate == predicate.predicate
 
         return self.predicate == predicate
+
+
+class Atom:
+    """Ground atom: the name of a predicate applied to a tuple of object names.
+
+    Atoms are interned, so there is only one instance for every (name, args) pair. This means
+    that they can be compared by identity and that a state can be stored as a frozenset of atoms.
+    The table of interned atoms only holds weak references, so the atoms of the problems that are not
+    used anymore are freed.
+    """
+    __slots__ = ('name', 'args', '_hash', '__weakref__')
+
+    _interned = WeakValueDictionary()
+    _lock = threading.Lock() # Makes the creation of an atom atomic when atoms are made in many threads.
+
+    def __new__(cls, name, args):
+        """
+        :param name: Name of the predicate.
+        :param args: Tuple with the names of the objects.
+        """
+        key = (name, args)
+        atom = cls._interned.get(key)
+        if atom is None:
+            with cls._lock:
+                # Another thread may have created it while this one waited.
+                atom = cls._interned.get(key)
+                if atom is None:
+                    atom = super().__new__(cls)
+                    atom.name = name
+                    atom.args = args
+                    atom._hash = hash(key)
+                    cls._interned[key] = atom
+        return atom
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (Atom, (self.name, self.args))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __str__(self):
+        return '({0} {1})'.format(self.name, ' '.join(self.args))
+
+    def __repr__(self):
+        return f'Atom{str(self)}'
@@ -1,3 +1,6 @@
+from io import StringIO
+from writer import write_problem
+
 class Problem:
     """Representation of a problem."""
     def __init__(self, name, domain, objects, state, goal):
@@ -19,26 +22,13 @@ class Problem:
                 d_objects[object.type].append(object)
 
         self.d_objects = d_objects
+        self.object_types = {o.name: tipo for tipo in d_objects for o in d_objects[tipo]}
         self.state = state
         self.goal = goal
+        self.init_atoms = frozenset(p.atom() for p in state) # Initial state as an immutable set of ground atoms.
+        self.goal_atoms = frozenset(p.atom() for p in goal)
 
     def __str__(self):
-        dic = {'name':          self.name,
-               'domain_name':   self.domain.name,
-               'objects':       "\n      ".join(" ".join(o.name for o in self.d_objects[tipo]) + " - " + tipo for tipo in self.d_objects),
-               'init':          "\n      ".join(str(p) for p in self.state),
-               'goal':          "\n      ".join(str(p) for p in self.goal)}
-
-        if len(self.goal) >= 2:
-            dic['goal'] = "(and " + dic['goal'] + ")"
-
-        return """(define (problem {name}
-    (:domain {domain_name})
-    (:objects
-      {objects})
-    (:init
-      {init})
-    (:goal
-      {goal})
-)
-""".format(**dic)
+        f = StringIO()
+        write_problem(self, f)
+        return f.getvalue()
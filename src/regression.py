@@ -0,0 +1,267 @@
+import logging
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+from math import inf
+from engine import SearchEngine
+from grounding import GroundTask, reachable_pairs
+from heuristics import HEURISTICS
+from planner import Planner
+
+logger = logging.getLogger(__name__)
+
+class Subgoal:
+    """Node of the backward search: a partial state, the operator regressed to obtain it and the
+    subgoal it was regressed from, which is closer to the goal."""
+    __slots__ = ('atoms', 'op', 'child', 'level')
+
+    def __init__(self, atoms, op=None, child=None):
+        """
+        :param atoms: Frozenset of ground atoms that must be true.
+        :param op: Operator that, applied in any state with these atoms, reaches the child.
+        :param child: Subgoal from where this one was regressed. None for the goal.
+        """
+        self.atoms = atoms
+        self.op = op
+        self.child = child
+        self.level = 0 if child is None else child.level + 1
+
+    def operators(self):
+        """Returns the operators that reach the goal from this subgoal, in the order they are applied."""
+        ops = []
+        s = self
+        while s.child is not None:
+            ops.append(s.op)
+            s = s.child
+        return ops
+
+class SubgoalIndex:
+    """Set of subgoals indexed by their smallest atom. It finds, without comparing against all of them,
+    a subgoal contained in a given set of atoms: only the subgoals whose smallest atom is in the set
+    can be contained in it. The empty subgoal, reached through operators without preconditions, is
+    kept under None and is contained in any set of atoms."""
+    def __init__(self):
+        self.by_first = {}
+        self.size = 0
+
+    def add(self, subgoal):
+        first = min(subgoal.atoms, key=_key) if subgoal.atoms else None
+        self.by_first.setdefault(first, []).append(subgoal)
+        self.size += 1
+
+    def contained_in(self, atoms):
+        """Returns a subgoal whose atoms are all in the given ones, or None.
+        :param atoms: Frozenset of ground atoms, a state or another subgoal.
+        """
+        by_first = self.by_first
+        if None in by_first:
+            return by_first[None][0]
+        for a in atoms:
+            for subgoal in by_first.get(a, ()):
+                if subgoal.atoms <= atoms:
+                    return subgoal
+        return None
+
+def _key(atom):
+    return (atom.name, atom.args)
+
+def regress(atoms, op):
+    """Returns the subgoal from which the operator reaches the given subgoal, or None if the operator is
+    not relevant (it adds none of the atoms) or not consistent (it deletes one of them).
+    :param atoms: Frozenset of ground atoms of the subgoal.
+    :param op: Ground operator.
+    """
+    if atoms.isdisjoint(op.add_atoms) or not atoms.isdisjoint(op.delete_atoms):
+        return None
+    return atoms.difference(op.add_atoms).union(op.predicates)
+
+class _Backward:
+    """Best-first regression from the goal. The heuristic value of a subgoal combines the relaxed costs
+    of its atoms from the initial state, which are computed only once (like HSPr), so evaluating a
+    subgoal is cheap. A subgoal is discarded when it contains a subgoal already generated
+    (subsumption), since every state that satisfies it also satisfies the older one, and, as a dead
+    end, when it has two mutex facts or a fact that is not reachable."""
+    def __init__(self, planner, task, heuristic, weight, stats):
+        self.achievers = {} # Dictionary that maps every atom to the operators that add it.
+        for op in task.operators:
+            for a in op.add_atoms:
+                self.achievers.setdefault(a, []).append(op)
+        self.index = task.index
+        self.pairs = reachable_pairs(task, planner.state)
+        h = HEURISTICS[heuristic](Planner(planner.domain, planner.problem, planner.state, task))
+        self.cost, _ = h.costs(planner.state, until_goal=False)
+        self.combine = h.combine
+        self.weight = weight
+        self.stats = stats
+
+        root = Subgoal(planner.problem.goal_atoms)
+        self.seen = SubgoalIndex()
+        self.seen.add(root)
+        self.tie = count()
+        self.open = [(0, 0, next(self.tie), root)]
+
+    def evaluate(self, atoms):
+        """Returns the heuristic value of the subgoal, inf if it can't be reached from the initial state."""
+        value = 0
+        cost = self.cost
+        combine = self.combine
+        for a in atoms:
+            value = combine(value, cost[self.index[a]])
+        return value
+
+    def expand(self):
+        """Regresses the best subgoal of the open list through its relevant operators, and returns the new subgoals."""
+        stats = self.stats
+        index = self.index
+        pairs = self.pairs
+        s = heappop(self.open)[3]
+        stats.expanded += 1
+        result = []
+
+        for op in {op for a in s.atoms for op in self.achievers.get(a, ())}:
+            atoms = regress(s.atoms, op)
+            if atoms is None:
+                continue
+            stats.generated += 1
+            facts = [index[a] for a in atoms]
+            if any(not pairs[i].issuperset(facts) for i in facts):
+                stats.dead_ends += 1
+                continue
+            if self.seen.contained_in(atoms) is not None:
+                stats.duplicates += 1
+                continue
+            h = self.evaluate(atoms)
+            if h == inf:
+                stats.dead_ends += 1
+                continue
+            subgoal = Subgoal(atoms, op, s)
+            self.seen.add(subgoal)
+            heappush(self.open, (subgoal.level + self.weight * h, h, next(self.tie), subgoal))
+            result.append(subgoal)
+
+        return result
+
+def _follow(p, subgoal):
+    """Applies to the planner the operators that take the subgoal to the goal, and returns the last planner."""
+    for op in subgoal.operators():
+        p = p.apply_action(op.action, op.predicates)
+    if not p.is_goal():
+        raise Exception('The regressed plan does not reach the goal.')
+    return p
+
+class RegressionSearch(SearchEngine):
+    """Backward search: best-first from the goal of the problem, regressing it through the operators
+    that add some of its atoms, until a subgoal holds in the initial state. The goals are usually small
+    partial states, so the branching factor is lower than forward. The plan is returned as the forward
+    planners that apply it from the root, so it's written like the plans of the other engines."""
+    def __init__(self, planner, heuristic='hadd', weight=2, stats=None):
+        """
+        :param planner: Root planner.
+        :param heuristic: One of the keys of heuristics.HEURISTICS: hmax combines the costs of the atoms
+            of a subgoal with max, and the rest with a sum.
+        :param weight: Weight of the heuristic value. The subgoals are ordered by level + weight * h.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        """
+        super().__init__(planner, stats)
+        self.heuristic = heuristic
+        self.weight = weight
+
+    def _search(self, stats):
+        root = self.planner
+        if root.is_goal():
+            return root
+        task = root.task if root.task is not None else GroundTask(root.domain, root.problem)
+        if not task.goal_reachable:
+            return -1
+
+        backward = _Backward(root, task, self.heuristic, self.weight, stats)
+        best = inf
+        while backward.open:
+            for subgoal in backward.expand():
+                if subgoal.atoms <= root.state:
+                    return _follow(root, subgoal)
+            if backward.open and backward.open[0][1] < best:
+                best = backward.open[0][1]
+                stats.progress(len(backward.open), h=best)
+                logger.info('Best heuristic value: %s', best)
+            stats.sample(len(backward.open))
+
+        return -1
+
+class BidirectionalSearch(SearchEngine):
+    """Forward BFS from the initial state and best-first regression from the goal, expanding a node
+    of the side that has generated fewer nodes every time, until a state of the forward search
+    satisfies a subgoal of the backward one. The forward states are matched against the subgoals
+    through the index of the subgoals, and the subgoals against the states through an index of the
+    forward states by atom."""
+    def __init__(self, planner, heuristic='hadd', weight=2, stats=None):
+        """
+        :param planner: Root planner.
+        :param heuristic: Heuristic of the backward search, one of the keys of heuristics.HEURISTICS.
+        :param weight: Weight of the heuristic value in the backward search.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        """
+        super().__init__(planner, stats)
+        self.heuristic = heuristic
+        self.weight = weight
+
+    def _search(self, stats):
+        root = self.planner
+        if root.is_goal():
+            return root
+        if root.task is None:
+            root = Planner(root.domain, root.problem, root.state, GroundTask(root.domain, root.problem))
+        if not root.task.goal_reachable:
+            return -1
+
+        backward = _Backward(root, root.task, self.heuristic, self.weight, stats)
+        queue = deque([root])
+        visited = {root.state}
+        by_atom = {} # Dictionary that maps every atom to the forward planners whose state has it.
+        for a in root.state:
+            by_atom.setdefault(a, []).append(root)
+        forward_work = backward_work = 0 # Nodes generated by every side.
+        level = 0
+
+        while queue and backward.open:
+            if forward_work <= backward_work:
+                v = queue.popleft()
+                if v.level != level:
+                    level = v.level
+                    stats.progress(len(queue) + len(backward.open), level=level)
+                    logger.info('Level of exploration: %d', level)
+                actions = v.applicable_actions()
+                stats.expanded += 1
+                for a in actions:
+                    for pred in actions[a]:
+                        p = v.apply_action(a, pred)
+                        stats.generated += 1
+                        forward_work += 1
+                        if p.state in visited:
+                            stats.duplicates += 1
+                            continue
+                        subgoal = backward.seen.contained_in(p.state)
+                        if subgoal is not None:
+                            return _follow(p, subgoal)
+                        visited.add(p.state)
+                        queue.append(p)
+                        for atom in p.state:
+                            by_atom.setdefault(atom, []).append(p)
+            else:
+                generated = stats.generated
+                for subgoal in backward.expand():
+                    p = self._meet(subgoal, by_atom)
+                    if p is not None:
+                        return _follow(p, subgoal)
+                backward_work += stats.generated - generated + 1
+            stats.sample(len(queue) + len(backward.open))
+
+        return -1
+
+    def _meet(self, subgoal, by_atom):
+        """Returns a forward planner whose state satisfies the subgoal, or None."""
+        candidates = min((by_atom.get(a, ()) for a in subgoal.atoms), key=len)
+        for p in candidates:
+            if subgoal.atoms <= p.state:
+                return p
+        return None
@@ -0,0 +1,188 @@
+import logging
+from collections import deque
+from time import perf_counter
+from grounding import GroundTask
+from heuristics import HEURISTICS
+from planner import Planner
+from search import SEARCHES
+from stats import SearchStatistics
+
+logger = logging.getLogger(__name__)
+
+class CachedHeuristic:
+    """Heuristic that remembers the value of every state it evaluates. The goal doesn't change
+    between replanning calls, so the values stay valid while the ground task is the same."""
+    def __init__(self, heuristic):
+        """
+        :param heuristic: Heuristic to cache.
+        """
+        self.heuristic = heuristic
+        self.values = {}
+        self.hits = 0
+
+    def __call__(self, state):
+        value = self.values.get(state)
+        if value is None:
+            value = self.values[state] = self.heuristic(state)
+        else:
+            self.hits += 1
+        return value
+
+def _atom(a):
+    """Returns the ground atom of a predicate, or the atom itself."""
+    return a.atom() if hasattr(a, 'atom') else a
+
+class Replanner:
+    """Solves a problem and then solves it again, cheaply, every time its current state changes a little.
+
+    After a change, the old plan is tried first: if some suffix of it can still be executed from the new
+    state, or from a state a few actions away, the plan is repaired. For every suffix, the atoms it needs
+    are obtained regressing the goal through it, so checking if a state can continue with a suffix is a
+    subset test. If the plan can't be repaired, a new search is run, warm-started with the ground task
+    and the cached heuristic values of the previous calls."""
+    def __init__(self, domain, problem, search='gbfs', heuristic='hff', weight=2, repair_limit=1000):
+        """
+        :param domain: Domain of the world.
+        :param problem: Problem to solve. Its goal stays the same in every call.
+        :param search: Best-first engine used when the plan can't be repaired: gbfs, astar or wastar.
+        :param heuristic: One of the keys of heuristics.HEURISTICS.
+        :param weight: Weight of the heuristic in wastar.
+        :param repair_limit: Maximum number of nodes expanded looking for a state from where the old plan
+            can be continued.
+        """
+        if search not in ('gbfs', 'astar', 'wastar'):
+            raise Exception(f'Replanning needs a best-first engine (gbfs, astar or wastar), not {search}.')
+        self.domain = domain
+        self.problem = problem
+        self.search = search
+        self.heuristic_name = heuristic
+        self.weight = weight
+        self.repair_limit = repair_limit
+        self.state = problem.init_atoms # Current state of the world.
+        self.offline = set() # Objects that can't be used.
+        self.task = GroundTask(domain, problem)
+        self.heuristic = None
+        self.plan = None # Operators of the last plan, or None if there is no plan.
+        self.stats = SearchStatistics()
+        self.method = None # How the last plan was obtained: search, revalidated or repaired.
+        self.time = 0 # Seconds of the last call.
+
+    def solve(self):
+        """Searches a plan from the current state, reusing the ground task and the cached heuristic values.
+        It returns the planner with the problem already on the goal. Otherwise it will return -1."""
+        start = perf_counter()
+        if self.heuristic is None:
+            root = Planner(self.domain, self.problem, self.state, self.task)
+            self.heuristic = CachedHeuristic(HEURISTICS[self.heuristic_name](root))
+
+        root = Planner(self.domain, self.problem, self.state, self.task)
+        self.stats = SearchStatistics()
+        if self.search == 'wastar':
+            engine = SEARCHES['wastar'](root, self.heuristic, self.weight, self.stats)
+        else:
+            engine = SEARCHES[self.search](root, self.heuristic, self.stats)
+        p = engine.search()
+
+        self.method = 'search'
+        self._record(p)
+        self.time = perf_counter() - start
+        return p
+
+    def replan(self, add=(), delete=(), offline=()):
+        """Applies the changes to the current state and returns the planner that reaches the goal from the
+        new state, repairing the old plan if possible. Otherwise it will return -1.
+        :param add: Predicates or atoms that are now true.
+        :param delete: Predicates or atoms that are now false.
+        :param offline: Names of the objects, like arms, that can't be used anymore.
+        """
+        start = perf_counter()
+        self.state = self.state.difference(_atom(a) for a in delete).union(_atom(a) for a in add)
+
+        if not self.state <= set(self.task.index):
+            # Some new atom was never reached from the original state: the task is grounded again.
+            logger.info('The new state has new facts: grounding again.')
+            problem = _Problem(self.problem, self.state)
+            self.task = GroundTask(self.domain, problem)
+            if self.offline:
+                self.task = self.task.without(self.offline)
+            self.heuristic = None
+        if set(offline) - self.offline:
+            self.offline.update(offline)
+            self.task = self.task.without(self.offline)
+            self.heuristic = None # The relaxed costs change without the operators of the objects.
+
+        p = self._repair() if self.plan is not None else None
+        if p is None:
+            return self.solve()
+
+        self._record(p)
+        self.time = perf_counter() - start
+        return p
+
+    def _repair(self):
+        """Returns the planner that reaches the goal continuing a suffix of the old plan from the current
+        state, or from the nearest state found by a BFS limited to repair_limit expansions. Returns None
+        if there is none."""
+        by_match = self.task.operators_by_match
+        plan = [by_match.get((op.action, op.predicates)) for op in self.plan]
+        if None in plan:
+            return None # Some action of the plan uses an object that is offline.
+
+        # needed[i] has the atoms that must be true to execute plan[i:] and reach the goal.
+        needed = [None] * (len(plan) + 1)
+        needed[-1] = self.problem.goal_atoms
+        for i in range(len(plan) - 1, -1, -1):
+            op = plan[i]
+            needed[i] = needed[i + 1].difference(op.add_atoms).union(op.predicates)
+
+        self.stats = stats = SearchStatistics()
+        stats.started()
+        root = Planner(self.domain, self.problem, self.state, self.task)
+        queue = deque([root])
+        visited = {root.state}
+        result = None
+
+        while queue and stats.expanded <= self.repair_limit:
+            v = queue.popleft()
+            # The suffixes are tried from the shortest one, to skip the actions that are no longer needed.
+            i = next((i for i in range(len(plan), -1, -1) if needed[i] <= v.state), None)
+            if i is not None:
+                self.method = 'revalidated' if v is root and i == 0 else 'repaired'
+                result = v
+                for op in plan[i:]:
+                    result = result.apply_action(op.action, op.predicates)
+                break
+
+            actions = v.applicable_actions()
+            stats.expanded += 1
+            for a in actions:
+                for pred in actions[a]:
+                    p = v.apply_action(a, pred)
+                    stats.generated += 1
+                    if p.state in visited:
+                        stats.duplicates += 1
+                        continue
+                    visited.add(p.state)
+                    queue.append(p)
+
+        stats.finished(result if result is not None else -1)
+        return result
+
+    def _record(self, p):
+        """Stores the operators of the plan that reaches the planner."""
+        if p == -1:
+            self.plan = None
+            return
+        ops = []
+        while p.father is not None:
+            ops.append(self.task.operators_by_match[p.action_taken])
+            p = p.father
+        ops.reverse()
+        self.plan = ops
+
+class _Problem:
+    """Problem with another initial state, only to ground it again."""
+    def __init__(self, problem, state):
+        self.init_atoms = state
+        self.goal_atoms = problem.goal_atoms
+        self.object_types = problem.object_types
@@ -0,0 +1,170 @@
+import logging
+from functools import partial
+from heapq import heappop, heappush
+from itertools import count
+from math import inf
+from bfs import BFS, state_key
+from deepening import IDDFS, IDAStar
+from engine import SearchEngine
+from external import ExternalBFS
+from heuristics import HEURISTICS
+from invariants import FiniteDomainEncoding
+from parallel import ParallelBFS
+from regression import BidirectionalSearch, RegressionSearch
+from planner import Planner
+from por import StubbornSets
+from symmetry import Symmetries
+from vectorized import VectorBFS
+
+logger = logging.getLogger(__name__)
+
+class BestFirstSearch(SearchEngine):
+    """Best-first search for the planner, ordered by f = g_weight * g + weight * h.
+    The open list is a binary heap. Ties in f are broken by the lowest h and then by insertion order."""
+    def __init__(self, planner, heuristic, weight=1, g_weight=1, stats=None, symmetries=None, reduction=None,
+                 encoding=None):
+        """
+        :param planner: Root planner.
+        :param heuristic: Function that receives a state and returns its heuristic value, inf for dead ends.
+        :param weight: Weight of the heuristic value.
+        :param g_weight: Weight of the cost of the path (the level of the planner).
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+        :param symmetries: Symmetries of the problem. If they are given, symmetric states are the same state.
+        :param reduction: StubbornSets of the problem. If it's given, only the actions of a stubborn set
+            are applied in every state.
+        :param encoding: FiniteDomainEncoding of the task. If it's given, the states are stored encoded.
+        """
+        super().__init__(planner, stats)
+        self.heuristic = heuristic
+        self.weight = weight
+        self.g_weight = g_weight
+        self.symmetries = symmetries
+        self.reduction = reduction
+        self.encoding = encoding
+
+    def search(self):
+        result = super().search()
+        if result == -1:
+            logger.info('The search finished without reaching the goal: %s.', self.stats.outcome)
+        return result
+
+    def _search(self, stats):
+        if self.reduction is not None:
+            applicable_actions = stats.timed('applicable_actions', partial(self.reduction.applicable_actions, stats=stats))
+        else:
+            applicable_actions = stats.timed('applicable_actions', Planner.applicable_actions)
+        apply_action = stats.timed('apply_action', Planner.apply_action)
+        is_goal = stats.timed('is_goal', Planner.is_goal)
+        heuristic = stats.timed('heuristic', self.heuristic)
+
+        tie = count()
+        h = heuristic(self.planner.state)
+        if h == inf:
+            stats.dead_ends += 1
+            return -1
+
+        open_list = [(self.weight * h, h, next(tie), self.planner)]
+        key = state_key(self.symmetries, self.encoding)
+        best_g = {key(self.planner.state): 0} # Lowest level with which every state has been generated.
+        best_h = inf
+
+        while open_list:
+            _, h, _, v = heappop(open_list)
+            if v.level > best_g[key(v.state)]:
+                continue # A better path to this state was found after queueing it.
+
+            if h < best_h:
+                stats.progress(len(open_list) + 1, h=h, level=v.level)
+                logger.info('Best heuristic value: %s', h)
+                best_h = h
+
+            if is_goal(v):
+                return v
+
+            actions = applicable_actions(v)
+            stats.expanded += 1
+
+            for a in actions:
+                for pred in actions[a]:
+                    p = apply_action(v, a, pred)
+                    stats.generated += 1
+                    k = key(p.state)
+                    if best_g.get(k, inf) <= p.level:
+                        stats.duplicates += 1
+                        continue
+                    if self.g_weight == 0 and k in best_g:
+                        stats.duplicates += 1
+                        continue # Greedy search never reopens states.
+                    h = heuristic(p.state)
+                    if h == inf:
+                        stats.dead_ends += 1
+                        continue
+                    best_g[k] = p.level
+                    heappush(open_list, (self.g_weight * p.level + self.weight * h, h, next(tie), p))
+
+            stats.sample(len(open_list))
+
+        return -1
+
+class GreedyBestFirst(BestFirstSearch):
+    """Greedy best-first search: ordered only by the heuristic value."""
+    def __init__(self, planner, heuristic, stats=None, symmetries=None, reduction=None, encoding=None):
+        super().__init__(planner, heuristic, weight=1, g_weight=0, stats=stats, symmetries=symmetries, reduction=reduction,
+                         encoding=encoding)
+
+class AStar(BestFirstSearch):
+    """A*: ordered by f = g + h. With an admissible heuristic, like h_max, the plan is optimal."""
+    def __init__(self, planner, heuristic, stats=None, symmetries=None, reduction=None, encoding=None):
+        super().__init__(planner, heuristic, weight=1, g_weight=1, stats=stats, symmetries=symmetries, reduction=reduction,
+                         encoding=encoding)
+
+class WeightedAStar(BestFirstSearch):
+    """Weighted A*: ordered by f = g + w * h. The plan is at most w times longer than the optimal one
+    if the heuristic is admissible."""
+    def __init__(self, planner, heuristic, weight=2, stats=None, symmetries=None, reduction=None, encoding=None):
+        super().__init__(planner, heuristic, weight=weight, g_weight=1, stats=stats, symmetries=symmetries,
+                         reduction=reduction, encoding=encoding)
+
+SEARCHES = {'bfs': BFS, 'gbfs': GreedyBestFirst, 'astar': AStar, 'wastar': WeightedAStar, 'parallel': ParallelBFS,
+            'external': ExternalBFS, 'iddfs': IDDFS, 'idastar': IDAStar,
+            'regression': RegressionSearch, 'bidirectional': BidirectionalSearch, 'vector': VectorBFS}
+
+def make_search(name, planner, heuristic='hff', weight=2, workers=None, stats=None, memory_budget=64,
+                table_size=100000, policy='lru', symmetry=False, por=False, sas=False):
+    """Returns the search engine with the given name for the planner.
+    :param name: One of the keys of SEARCHES.
+    :param planner: Root planner.
+    :param heuristic: One of the keys of heuristics.HEURISTICS. It's ignored by the blind engines.
+    :param weight: Weight of the heuristic for weighted A*.
+    :param workers: Number of processes of the parallel BFS. By default, the number of cores.
+    :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+    :param memory_budget: Megabytes of successors kept in memory by the external BFS before writing them to disk.
+    :param table_size: Maximum number of states of the transposition table of the iterative deepening engines.
+    :param policy: Replacement policy of the transposition table, one of the keys of deepening.TABLES.
+    :param symmetry: Whether BFS and the best-first engines treat symmetric states as the same state.
+    :param por: Whether BFS and the best-first engines use partial-order reduction with strong stubborn sets.
+        The planner must have a ground task.
+    :param sas: Whether BFS, the best-first engines and the iterative deepening engines store the states
+        encoded as finite-domain vectors. The planner must have a ground task.
+    """
+    symmetries = Symmetries(planner.problem) if symmetry else None
+    reduction = StubbornSets(planner.task, planner.state) if por else None
+    encoding = FiniteDomainEncoding(planner.task, planner.domain, planner.state) if sas else None
+    if name == 'bfs':
+        return BFS(planner, stats, symmetries, reduction, encoding)
+    if name == 'parallel':
+        return ParallelBFS(planner, workers, stats)
+    if name == 'external':
+        return ExternalBFS(planner, memory_budget, stats=stats)
+    if name == 'vector':
+        return VectorBFS(planner, stats)
+    if name in ('regression', 'bidirectional'):
+        return SEARCHES[name](planner, heuristic, weight, stats)
+    if name == 'iddfs':
+        return IDDFS(planner, table_size, policy, stats, encoding)
+    h = HEURISTICS[heuristic](planner)
+    if name == 'wastar':
+        return WeightedAStar(planner, h, weight, stats, symmetries, reduction, encoding)
+    if name == 'idastar':
+        return IDAStar(planner, h, table_size, policy, stats, encoding)
+    return SEARCHES[name](planner, h, stats, symmetries, reduction, encoding)
@@ -0,0 +1,145 @@
+import json
+from time import perf_counter
+
+try:
+    import resource
+except ImportError:
+    resource = None # Only available on Unix. Without it, the memory is not measured.
+
+class SearchStatistics:
+    """Counters, timers and progress records of a search engine.
+
+    The engines always update the counters. The time spent in every phase of the search is only
+    measured when timing is on: the engines call the functions returned by timed, which are the
+    original functions when it's off, so it costs nothing.
+
+    Every callback is called as callback(event, stats, record), where event is 'progress' (a new
+    level of BFS or a better heuristic value), 'sample' (every sample_every expansions) or 'finished'.
+    """
+    def __init__(self, timing=False, sample_every=None, callbacks=()):
+        """
+        :param timing: Whether to measure the time spent in applicable_actions, apply_action and is_goal.
+        :param sample_every: If it's given, a sample of the counters and the open list is taken every
+            this many expansions.
+        :param callbacks: Functions called on every event.
+        """
+        self.timing = timing
+        self.sample_every = sample_every
+        self.callbacks = list(callbacks)
+        self.reset()
+
+    def reset(self):
+        """Sets all the counters to zero."""
+        self.expanded = 0 # Nodes whose successors were generated.
+        self.generated = 0 # Successors generated, including the duplicates.
+        self.duplicates = 0 # Successors discarded because their state was already seen.
+        self.pruned = 0 # Successors discarded by the how_many_goals filter of BFS.
+        self.dead_ends = 0 # Successors discarded because their heuristic value is infinite.
+        self.reduced = 0 # Successors not generated because of the partial-order reduction.
+        self.times = {} # Seconds spent in every timed function.
+        self.calls = {} # Calls to every timed function.
+        self.progress_records = []
+        self.samples = []
+        self.outcome = None # Why the search finished: solved, exhausted or exhausted after pruning.
+        self.start = None
+        self.end = None
+
+    def started(self):
+        """Resets the counters and marks the start of the search."""
+        self.reset()
+        self.start = perf_counter()
+
+    def finished(self, result):
+        """Marks the end of the search and records why it finished: solved, exhausted (the goal is not
+        reachable) or exhausted after pruning (the goal may be reachable through a pruned node).
+        :param result: Planner returned by the search, or -1.
+        """
+        self.end = perf_counter()
+        if result != -1:
+            self.outcome = 'solved'
+        elif self.pruned:
+            self.outcome = 'exhausted after pruning'
+        else:
+            self.outcome = 'exhausted'
+        self._emit('finished', self.to_dict())
+
+    def timed(self, name, function):
+        """Returns the function, measuring its time under the given name if timing is on.
+        :param name: Name of the phase.
+        :param function: Function to measure.
+        """
+        if not self.timing:
+            return function
+
+        times = self.times
+        calls = self.calls
+        times[name] = 0
+        calls[name] = 0
+
+        def wrapper(*args):
+            start = perf_counter()
+            result = function(*args)
+            times[name] += perf_counter() - start
+            calls[name] += 1
+            return result
+
+        return wrapper
+
+    def progress(self, open_size, **info):
+        """Records the progress of the search, like a new level of BFS.
+        :param open_size: Number of nodes in the open list.
+        :param info: Data of the progress, like the level.
+        """
+        record = dict(info, open=open_size, expanded=self.expanded, generated=self.generated,
+                      time=self.time, peak_memory=peak_memory())
+        self.progress_records.append(record)
+        self._emit('progress', record)
+        return record
+
+    def sample(self, open_size):
+        """Takes a sample of the counters if it's time to do it. It must be called after every expansion.
+        :param open_size: Number of nodes in the open list.
+        """
+        if self.sample_every and self.expanded % self.sample_every == 0:
+            record = {'open': open_size, 'expanded': self.expanded, 'generated': self.generated,
+                      'duplicates': self.duplicates, 'time': self.time}
+            self.samples.append(record)
+            self._emit('sample', record)
+
+    def _emit(self, event, record):
+        for callback in self.callbacks:
+            callback(event, self, record)
+
+    @property
+    def time(self):
+        """Seconds spent searching."""
+        if self.start is None:
+            return 0
+        return (self.end if self.end is not None else perf_counter()) - self.start
+
+    def to_dict(self):
+        """Returns the statistics as a dictionary that can be written as JSON."""
+        time = self.time
+        return {'outcome': self.outcome,
+                'expanded': self.expanded,
+                'generated': self.generated,
+                'duplicates': self.duplicates,
+                'pruned': self.pruned,
+                'dead_ends': self.dead_ends,
+                'reduced': self.reduced,
+                'search_time': time,
+                'nodes_per_second': self.expanded / time if time else 0,
+                'times': dict(self.times),
+                'calls': dict(self.calls),
+                'progress': self.progress_records,
+                'samples': self.samples}
+
+    def to_json(self):
+        """Returns the statistics as a JSON text."""
+        return json.dumps(self.to_dict())
+
+def peak_memory():
+    """Returns the peak resident memory of this process, in bytes, or None where it can't be measured."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,68 @@
+from predicate import Atom
+
+def _swap(atoms, a, b):
+    """Returns the atoms with the objects a and b swapped."""
+    swap = {a: b, b: a}
+    return frozenset(Atom(atom.name, tuple(swap.get(x, x) for x in atom.args)) for atom in atoms)
+
+class Symmetries:
+    """Groups of interchangeable objects of a problem.
+
+    Two objects of the same type are interchangeable when swapping them leaves the initial state and
+    the goal as they are. Then swapping them in any reachable state gives another reachable state at
+    the same distance from the goal, so only one of the two has to be explored. If a is interchangeable
+    with b and b with c, so are a and c, so the objects are split in groups where any permutation is
+    a symmetry of the problem.
+
+    The canonical key of a state renames the objects of every group in the order given by their role
+    in the state (the atoms they appear in), so symmetric states usually get the same key. States with
+    the same key are always symmetric, so the search keeps exploring concrete states and its plans
+    don't have to be mapped back."""
+    def __init__(self, problem):
+        """
+        :param problem: Problem whose symmetries are detected.
+        """
+        init, goal = problem.init_atoms, problem.goal_atoms
+        self.groups = []
+
+        for tipo in problem.d_objects:
+            pending = sorted(o.name for o in problem.d_objects[tipo])
+            while pending:
+                first = pending.pop(0)
+                group = [first]
+                for other in pending[:]:
+                    if _swap(init, first, other) == init and _swap(goal, first, other) == goal:
+                        group.append(other)
+                        pending.remove(other)
+                if len(group) > 1:
+                    self.groups.append(group)
+
+        self.group_of = {o: group for group in self.groups for o in group}
+
+    def __bool__(self):
+        return bool(self.groups)
+
+    def __str__(self):
+        return ', '.join('{' + ' '.join(group) + '}' for group in self.groups)
+
+    def canonical(self, state):
+        """Returns the canonical key of the state: the state with the objects of every group renamed.
+        :param state: Frozenset of ground atoms.
+        """
+        group_of = self.group_of
+        if not group_of:
+            return state
+
+        roles = {} # Dictionary that maps every object of a group to the atoms where it appears, without the objects of the groups.
+        for atom in state:
+            for position, x in enumerate(atom.args):
+                if x in group_of:
+                    role = (atom.name, position, tuple('' if y in group_of else y for y in atom.args))
+                    roles.setdefault(x, []).append(role)
+
+        rename = {}
+        for group in self.groups:
+            order = sorted(group, key=lambda x: sorted(roles.get(x, ())))
+            rename.update(zip(order, group))
+
+        return frozenset(Atom(atom.name, tuple(rename.get(x, x) for x in atom.args)) for atom in state)
@@ -0,0 +1,132 @@
+import logging
+from engine import SearchEngine
+from grounding import GroundTask
+
+try:
+    import numpy as np
+except ImportError:
+    np = None # The vectorized BFS is only available with NumPy.
+
+logger = logging.getLogger(__name__)
+
+CHUNK = 2 ** 22 # Maximum number of (state, operator) pairs tested for applicability at once.
+
+class VectorBFS(SearchEngine):
+    """BFS that expands a whole layer at once with NumPy.
+
+    The ground operators are encoded as matrices over the facts of the task: a precondition matrix,
+    an add matrix and a matrix with the facts every operator keeps (the ones it doesn't delete). A
+    layer is a 2D array of bit-packed states, one row per state, and it's expanded in chunks of rows:
+    the operators applicable in every state are the ones whose number of true preconditions, a matrix
+    product, is the number of their preconditions, and the successors are (state & keep) | add for
+    every pair, computed on the packed rows.
+
+    Every packed row is compared as a string of bytes: the repeated successors of a layer are removed
+    sorting them, and the ones already visited with a binary search over the sorted visited states.
+    Like ParallelBFS and ExternalBFS, it doesn't prune nodes with how_many_goals, so the plan is a
+    shortest one."""
+    def __init__(self, planner, stats=None):
+        """
+        :param planner: Root planner.
+        :param stats: SearchStatistics where the search is recorded. By default, one without timing.
+            Only the counters and the progress of every layer are recorded, since the states of a
+            chunk are expanded together.
+        """
+        if np is None:
+            raise Exception('The vector search needs NumPy (pip install -r requirements-optional.txt).')
+        super().__init__(planner, stats)
+
+    def _search(self, stats):
+        root = self.planner
+        if root.is_goal():
+            return root
+
+        task = root.task if root.task is not None else GroundTask(root.domain, root.problem)
+        if not task.goal_reachable:
+            return -1
+
+        n, m = len(task.facts), len(task.operators)
+        self.task = task
+        self.pre = np.zeros((n, m), dtype=np.float32) # Transposed, so that states @ pre counts the true preconditions.
+        self.needed = np.zeros(m, dtype=np.float32)
+        keep = np.ones((m, n), dtype=bool)
+        add = np.zeros((m, n), dtype=bool)
+        for i, op in enumerate(task.operators):
+            self.pre[list(op.pre), i] = 1
+            self.needed[i] = len(op.pre)
+            keep[i, list(op.delete)] = False
+            add[i, list(op.add)] = True
+        # The successors are computed on the packed states, 8 facts per byte.
+        self.keep = np.packbits(keep, axis=1)
+        self.add = np.packbits(add, axis=1)
+        self.facts = n
+        goal = np.zeros((1, n), dtype=bool)
+        goal[0, list(task.goal)] = True
+        goal = np.packbits(goal, axis=1)
+        expand = stats.timed('expand', self._expand)
+
+        state = np.zeros((1, n), dtype=bool)
+        state[0, [task.index[a] for a in root.state]] = True
+        layer = np.packbits(state, axis=1)
+        visited = self._keys(layer)
+        parents = [] # For every layer, the index of the parent of every state in the previous layer and its operator.
+        level = 0
+
+        while len(layer):
+            level += 1
+            logger.info('Level of exploration: %d', level)
+            keys, parent, op = expand(layer)
+            generated = len(keys)
+            stats.expanded += len(layer)
+            stats.generated += generated
+
+            # The successors are sorted, so the first one of every repeated state is kept.
+            keys, first = np.unique(keys, return_index=True)
+            parent, op = parent[first], op[first]
+            position = np.searchsorted(visited, keys)
+            seen = position < len(visited)
+            seen[seen] = visited[position[seen]] == keys[seen]
+            new = ~seen
+            keys, parent, op = keys[new], parent[new], op[new]
+            visited = np.insert(visited, position[new], keys)
+            stats.duplicates += generated - len(keys)
+
+            parents.append((parent, op))
+            layer = keys.view(np.uint8).reshape(len(keys), (n + 7) // 8)
+            stats.progress(len(layer), level=level, visited=len(visited))
+
+            reached = np.flatnonzero(((layer & goal) == goal).all(axis=1))
+            if len(reached):
+                return self._plan(int(reached[0]), parents)
+
+        return -1
+
+    def _expand(self, layer):
+        """Returns the successors of the packed states of the layer, as byte strings, with the index of
+        the state that generated every successor and the index of its operator."""
+        keys, parents, ops = [], [], []
+        rows = max(1, CHUNK // max(1, len(self.needed)))
+        for start in range(0, len(layer), rows):
+            states = layer[start:start + rows]
+            facts = np.unpackbits(states, axis=1, count=self.facts).astype(np.float32)
+            state, op = np.nonzero((facts @ self.pre) == self.needed)
+            keys.append(self._keys((states[state] & self.keep[op]) | self.add[op]))
+            parents.append(state + start)
+            ops.append(op)
+        return np.concatenate(keys), np.concatenate(parents), np.concatenate(ops)
+
+    def _keys(self, packed):
+        """Returns the rows of the packed states as a 1D array of byte strings, which can be sorted."""
+        packed = np.ascontiguousarray(packed)
+        return packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+
+    def _plan(self, i, parents):
+        """Returns the planner of the state i of the last layer, rebuilding its plan from the parents."""
+        ops = []
+        for parent, op in reversed(parents):
+            ops.append(self.task.operators[op[i]])
+            i = parent[i]
+        p = self.planner
+        for op in reversed(ops):
+            p = p.apply_action(op.action, op.predicates)
+        return p
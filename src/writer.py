@@ -0,0 +1,60 @@
+def write_domain(domain, f):
+    """Writes the domain in PDDL to the file object, one line at a time.
+    The text is the same as str(domain).
+    :param domain: Domain to write.
+    :param f: File object open for writing text.
+    """
+    f.write(f'(define (domain {domain.name})\n')
+    f.write('    (:requirements :strips :typing)\n')
+    f.write('    (:types\n')
+    for t in domain.types:
+        f.write(f'        {t}\n')
+    f.write('    )\n')
+    f.write('    (:predicates\n')
+    for p in domain.predicates:
+        f.write(f'        {p}\n')
+    f.write('    )\n')
+    for a in domain.actions:
+        f.write(f'    {a}\n')
+    f.write(')\n')
+
+def _write_list(items, f, separator):
+    """Writes str(item) of every item, with the separator between them."""
+    for i, item in enumerate(items):
+        if i:
+            f.write(separator)
+        f.write(str(item))
+
+def write_problem(problem, f):
+    """Writes the problem in PDDL to the file object, one fact at a time, so the text of the
+    whole problem is never in memory. The text is the same as str(problem).
+    :param problem: Problem to write.
+    :param f: File object open for writing text.
+    """
+    f.write(f'(define (problem {problem.name})\n')
+    f.write(f'    (:domain {problem.domain.name})\n')
+    f.write('    (:objects\n      ')
+    _write_list((' '.join(o.name for o in problem.d_objects[tipo]) + ' - ' + tipo for tipo in problem.d_objects),
+                f, '\n      ')
+    f.write(')\n')
+    f.write('    (:init\n      ')
+    _write_list(problem.state, f, '\n      ')
+    f.write(')\n')
+    f.write('    (:goal\n      ')
+    if len(problem.goal) != 1: # An empty goal is written as (and ).
+        f.write('(and ')
+        _write_list(problem.goal, f, '\n      ')
+        f.write(')')
+    else:
+        _write_list(problem.goal, f, '\n      ')
+    f.write(')\n')
+    f.write(')\n')
+
+def write_plan(planner, f):
+    """Writes the plan that reaches the planner, one action per line, like (pick-up k1 cc p1 cb).
+    :param planner: Last planner of the plan.
+    :param f: File object open for writing text.
+    """
+    for step in planner.plan():
+        f.write(step)
+        f.write('\n')
@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pytest
+
+# The modules of the planner are imported by their names, as the scripts in src do.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from dwr import load
+from grounding import GroundTask
+from pddl import parse_domain, parse_problem
+from planner import Planner
+
+# Domain whose only action has no parameters nor preconditions, and a problem with an empty initial state.
+EMPTY_DOMAIN = '''
+(define (domain switch)
+    (:predicates (ready))
+    (:action go :parameters () :precondition (and) :effect (ready)))
+'''
+EMPTY_PROBLEM = '''
+(define (problem empty)
+    (:domain switch)
+    (:objects)
+    (:init)
+    (:goal (ready)))
+'''
+
+@pytest.fixture
+def dwr():
+    """The domain and the problem dwrpb1 of dwr.load."""
+    return load()
+
+@pytest.fixture
+def empty():
+    """A domain and a problem with an empty initial state, solved by one action without preconditions."""
+    domain = parse_domain(EMPTY_DOMAIN)
+    return domain, parse_problem(EMPTY_PROBLEM, domain)
+
+def root(domain, problem):
+    """Returns the root planner of the problem, with its ground task."""
+    return Planner(domain, problem, task=GroundTask(domain, problem))
+
+def replay(domain, problem, p):
+    """Checks the plan that reaches the planner p by applying it, without the ground task, from the
+    initial state of the problem: every action must be applicable and the last state must be a goal."""
+    steps = []
+    while p.father is not None:
+        steps.append(p.action_taken)
+        p = p.father
+
+    p = Planner(domain, problem)
+    for action, predicates in reversed(steps):
+        assert p.state.issuperset(predicates) and p.verify_action(action, predicates), \
+            f'{action.name} {[str(a) for a in predicates]} is not applicable.'
+        p = p.apply_action(action, predicates)
+    assert p.is_goal()
+    return len(steps)
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from codegen import compile_action
+from conftest import root
+from generator import generate
+from matcher import StateIndex, match
+from pddl import parse_domain, parse_problem
+from planner import Planner
+
+def _states(planner, n, seed=0):
+    """Returns the states of a random walk of n steps from the planner."""
+    rng = random.Random(seed)
+    states = [planner.state]
+    p = planner
+    for _ in range(n):
+        successors = [(a, pre) for a, pres in p.applicable_actions().items() for pre in pres]
+        if not successors:
+            break
+        p = p.apply_action(*rng.choice(successors))
+        states.append(p.state)
+    return states
+
+def _check(domain, problem, states):
+    """Checks the compiled functions of every action against the interpreted matchers and the ground task."""
+    grounded = root(domain, problem)
+    types = problem.object_types
+    for state in states:
+        planner = Planner(domain, problem, state)
+        index = StateIndex(state)
+        for action in domain.actions:
+            compiled = compile_action(action)
+            matches = compiled.match(index.by_name, index.by_arg, types)
+            assert matches == match(action, index, types)
+            assert sorted(map(str, matches)) == sorted(map(str, planner.applicable_action_by_combinations(action)))
+
+            for predicates in matches:
+                op = grounded.task.operators_by_match[(action, predicates)]
+                assert compiled.effects(predicates) == (op.delete_atoms, op.add_atoms)
+                assert compiled.apply(state, predicates) == state.difference(op.delete_atoms).union(op.add_atoms)
+
+def test_dwr(dwr):
+    domain, problem = dwr
+    _check(domain, problem, _states(Planner(domain, problem), 40))
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_generated(dwr, seed):
+    domain = dwr[0]
+    problem = generate(domain, 5, 3, 2, seed=seed)
+    _check(domain, problem, _states(Planner(domain, problem), 25, seed))
+
+def test_empty(empty):
+    domain, problem = empty
+    _check(domain, problem, [problem.init_atoms])
+
+def test_repeated_predicate():
+    # Two preconditions with the same predicate must be matched to two different atoms.
+    domain = parse_domain('''
+    (define (domain pairs)
+        (:types node)
+        (:predicates (p ?a - node) (q ?a - node ?b - node))
+        (:action link :parameters (?a - node ?b - node) :precondition (and (p ?a) (p ?b)) :effect (q ?a ?b)))
+    ''')
+    problem = parse_problem('''
+    (define (problem three)
+        (:domain pairs)
+        (:objects x y z - node)
+        (:init (p x) (p y) (p z))
+        (:goal (q x y)))
+    ''', domain)
+    action = domain.actions[0]
+    index = StateIndex(problem.init_atoms)
+    matches = compile_action(action).match(index.by_name, index.by_arg, problem.object_types)
+    assert matches == match(action, index, problem.object_types)
+    assert len(matches) == 6 and all(a is not b for a, b in matches)
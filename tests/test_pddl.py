@@ -0,0 +1,61 @@
+from io import StringIO
+
+import pytest
+
+from pddl import load_task, parse_domain, parse_problem
+from writer import write_domain, write_problem
+from generator import generate
+
+def _written(write, item):
+    f = StringIO()
+    write(item, f)
+    return f.getvalue()
+
+def _round_trip(domain, problem):
+    """Writes the domain and the problem, parses them back and checks that they are the same."""
+    domain_text = _written(write_domain, domain)
+    problem_text = _written(write_problem, problem)
+    assert domain_text == str(domain)
+    assert problem_text == str(problem)
+
+    parsed = parse_domain(domain_text)
+    parsed_problem = parse_problem(problem_text, parsed)
+    assert _written(write_domain, parsed) == domain_text
+    assert _written(write_problem, parsed_problem) == problem_text
+    assert parsed_problem.init_atoms == problem.init_atoms
+    assert parsed_problem.goal_atoms == problem.goal_atoms
+    assert parsed_problem.object_types == problem.object_types
+
+def test_round_trip(dwr):
+    _round_trip(*dwr)
+
+@pytest.mark.parametrize('worst_case', [False, True])
+def test_round_trip_generated(dwr, worst_case):
+    domain = dwr[0]
+    _round_trip(domain, generate(domain, 10, 4, 2, seed=7, worst_case=worst_case))
+
+def test_round_trip_empty(empty):
+    _round_trip(*empty)
+
+def test_unbound_parameter():
+    text = '''
+    (define (domain d)
+        (:predicates (p ?a) (q ?a))
+        (:action go :parameters (?a ?b) :precondition (p ?a) :effect (q ?b)))
+    '''
+    with pytest.raises(Exception, match=r'\?b of the action go'):
+        parse_domain(text)
+
+def test_task_cache(dwr, tmp_path):
+    domain, problem = dwr
+    (tmp_path / 'domain.pddl').write_text(str(domain))
+    (tmp_path / 'problem.pddl').write_text(str(problem))
+    cache = tmp_path / 'cache'
+
+    first = load_task(tmp_path / 'domain.pddl', tmp_path / 'problem.pddl', cache)
+    assert len(list(cache.iterdir())) == 1
+    second = load_task(tmp_path / 'domain.pddl', tmp_path / 'problem.pddl', cache)
+    assert str(second[0]) == str(first[0]) and str(second[1]) == str(first[1])
+    assert len(second[2].operators) == len(first[2].operators)
+    applicable = lambda task, state: sorted(str(op) for op in task.applicable(state))
+    assert applicable(second[2], second[1].init_atoms) == applicable(first[2], first[1].init_atoms)
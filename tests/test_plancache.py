@@ -0,0 +1,80 @@
+import json
+
+from batch import problem_from_dict, problem_to_dict
+from conftest import replay, root
+from plancache import PlanCache, canonical_names, fingerprint
+from search import make_search
+
+def _renamed(domain, problem, prefix='x'):
+    """Returns the problem with every object renamed, and listed in the reverse order."""
+    d = problem_to_dict(problem)
+    rename = lambda args: [prefix + a for a in args]
+    return problem_from_dict(domain, {'name': d['name'],
+                                      'objects': {t: rename(os)[::-1] for t, os in d['objects'].items()},
+                                      'init': [[a[0]] + rename(a[1:]) for a in d['init']],
+                                      'goal': [[a[0]] + rename(a[1:]) for a in d['goal']]})
+
+def test_hit(dwr, tmp_path):
+    domain, problem = dwr
+    cache = PlanCache(str(tmp_path / 'plans.sqlite'))
+    p = cache.search(make_search('gbfs', root(domain, problem)))
+    assert cache.stats()['misses'] == 1 and cache.stats()['stored'] == 1
+
+    # The same problem, and the problem with other names, are found without searching.
+    assert cache.lookup(root(domain, problem)).plan() == p.plan()
+    renamed = _renamed(domain, problem)
+    q = cache.lookup(root(domain, renamed))
+    assert q is not None
+    assert replay(domain, renamed, q) == len(p.plan())
+    assert cache.stats()['hits'] == 2
+    cache.close()
+
+def test_invalid_plan(dwr, tmp_path):
+    domain, problem = dwr
+    path = str(tmp_path / 'plans.sqlite')
+    cache = PlanCache(path)
+    cache.search(make_search('gbfs', root(domain, problem)))
+
+    # A plan that doesn't reach the goal anymore is a miss, and it's removed.
+    with cache.db:
+        steps = json.loads(cache.db.execute('SELECT plan FROM plans').fetchone()[0])
+        cache.db.execute('UPDATE plans SET plan = ?', (json.dumps(steps[:-1]),))
+    assert cache.lookup(root(domain, problem)) is None
+    assert cache.stats()['invalid'] == 1
+    assert cache.db.execute('SELECT COUNT(*) FROM plans').fetchone()[0] == 0
+    assert cache.lookup(root(domain, problem)) is None
+    assert cache.stats()['misses'] == 2
+    cache.close()
+
+def test_eviction(dwr, tmp_path):
+    domain, problem = dwr
+    cache = PlanCache(str(tmp_path / 'plans.sqlite'), max_entries=1)
+    cache.search(make_search('gbfs', root(domain, problem)))
+    d = problem_to_dict(problem)
+    other = problem_from_dict(domain, dict(d, goal=d['goal'][:2]))
+    cache.search(make_search('gbfs', root(domain, other)))
+    assert cache.stats()['evicted'] == 1
+    assert cache.lookup(root(domain, problem)) is None
+    assert cache.lookup(root(domain, other)) is not None
+    cache.close()
+
+def test_symmetric_fingerprint(dwr):
+    # The on_top atoms of the containers make a 6-cycle and two 3-cycles, so every container looks
+    # the same after refinement, but not every one can be mapped to every other one.
+    domain = dwr[0]
+    cs = [f'c{i}' for i in range(12)]
+    edges = [(cs[i], cs[(i + 1) % 6]) for i in range(6)] + \
+            [(cs[6 + i], cs[6 + (i + 1) % 3]) for i in range(3)] + \
+            [(cs[9 + i], cs[9 + (i + 1) % 3]) for i in range(3)]
+    problem = problem_from_dict(domain, {'name': 'cycles', 'objects': {'container': cs},
+                                         'init': [['on_top', a, b] for a, b in edges], 'goal': []})
+    permutations = [cs[5:] + cs[:5], cs[::-1], cs[6:] + cs[:6], cs[3:9] + cs[:3] + cs[9:]]
+    keys = set()
+    for order in permutations:
+        names = dict(zip(cs, order))
+        renamed = problem_from_dict(domain, {'name': 'cycles', 'objects': {'container': order},
+                                             'init': [['on_top', names[a], names[b]] for a, b in edges],
+                                             'goal': []})
+        keys.add(fingerprint(domain, renamed))
+    assert keys == {fingerprint(domain, problem)}
+    assert len(set(canonical_names(problem).values())) == len(cs)
@@ -0,0 +1,43 @@
+import pytest
+
+from agenda import GoalAgenda
+from conftest import replay, root
+from search import SEARCHES, make_search
+from vectorized import np
+
+ENGINES = [pytest.param(name, marks=pytest.mark.skipif(np is None, reason='NumPy is not installed'))
+           if name == 'vector' else name for name in SEARCHES]
+
+# Blind engines that find plans as short as possible. The shortest plan of dwrpb1 has 12 actions.
+OPTIMAL = {'parallel', 'external', 'vector', 'iddfs'}
+
+def _search(name, planner, **options):
+    if name == 'agenda':
+        return GoalAgenda(planner, 'gbfs', **options).search()
+    return make_search(name, planner, workers=2, **options).search()
+
+@pytest.mark.parametrize('name', ENGINES + ['agenda'])
+def test_dwr(dwr, name):
+    domain, problem = dwr
+    p = _search(name, root(domain, problem))
+    assert p != -1
+    length = replay(domain, problem, p)
+    assert length == len(p.plan())
+    if name in OPTIMAL:
+        assert length == 12
+
+@pytest.mark.parametrize('name', ['bfs', 'gbfs', 'astar', 'idastar'])
+@pytest.mark.parametrize('option', ['symmetry', 'por', 'sas'])
+def test_dwr_options(dwr, name, option):
+    domain, problem = dwr
+    p = make_search(name, root(domain, problem), **{option: True}).search()
+    assert p != -1
+    replay(domain, problem, p)
+
+@pytest.mark.parametrize('name', ENGINES + ['agenda'])
+def test_empty_init(empty, name):
+    domain, problem = empty
+    p = _search(name, root(domain, problem))
+    assert p != -1
+    assert replay(domain, problem, p) == 1
+    assert p.plan() == ['(go )']